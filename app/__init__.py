@@ -1,5 +1,7 @@
 import os
+import orjson
 from flask import Flask
+from flask.json.provider import JSONProvider
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
 from flask_socketio import SocketIO
@@ -11,11 +13,22 @@ db = SQLAlchemy()
 login_manager = LoginManager()
 socketio = SocketIO()
 
+class OrjsonProvider(JSONProvider):
+    """基于orjson的响应序列化，比stdlib json快数倍；datetime等类型用str兜底"""
+
+    def dumps(self, obj, **kwargs):
+        # OPT_NON_STR_KEYS: 端口映射等字典可能以整数作键，与stdlib json行为保持一致
+        return orjson.dumps(obj, default=str, option=orjson.OPT_NON_STR_KEYS).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
 def create_app(config_name=None):
     if config_name is None:
         config_name = os.environ.get('FLASK_CONFIG', 'default')
-    
+
     app = Flask(__name__)
+    app.json = OrjsonProvider(app)
     app.config.from_object(config[config_name])
     
     # 初始化扩展
@@ -23,7 +36,14 @@ def create_app(config_name=None):
     login_manager.init_app(app)
     login_manager.login_view = 'auth.login'
     login_manager.login_message = '请先登录访问此页面。'
-    socketio.init_app(app, cors_allowed_origins="*", async_mode='threading')
+    # SOCKETIO_MESSAGE_QUEUE（如redis://...）存在时经消息队列做跨worker
+    # 广播；单worker部署不配置即可，行为不变
+    socketio.init_app(
+        app,
+        cors_allowed_origins="*",
+        async_mode='threading',
+        message_queue=os.environ.get('SOCKETIO_MESSAGE_QUEUE')
+    )
     CORS(app)
     
     # 注册蓝图
@@ -41,6 +61,16 @@ def create_app(config_name=None):
     
     # 创建数据库表
     with app.app_context():
+        # SQLite启用WAL：读写不再互斥，监控线程的状态写入不会阻塞页面读
+        if db.engine.url.drivername.startswith('sqlite'):
+            from sqlalchemy import event as sa_event
+
+            @sa_event.listens_for(db.engine, 'connect')
+            def _set_sqlite_pragma(dbapi_conn, connection_record):
+                cursor = dbapi_conn.cursor()
+                cursor.execute('PRAGMA journal_mode=WAL')
+                cursor.close()
+
         # 导入所有模型以确保表被创建
         from app.models.user import User
         from app.models.container import Container
@@ -44,6 +44,16 @@ class ImageInfo:
     size: str
     created: str
 
+    def to_dict(self) -> Dict[str, str]:
+        """只导出API可见字段，比__dict__少一次全属性拷贝"""
+        return {
+            'id': self.id,
+            'repository': self.repository,
+            'tag': self.tag,
+            'size': self.size,
+            'created': self.created
+        }
+
 class ContainerEngine(ABC):
     """容器引擎抽象基类"""
     
@@ -107,7 +117,20 @@ class ContainerEngine(ABC):
     def exec_command(self, container_id: str, command: str) -> Dict[str, Any]:
         """在容器中执行命令"""
         pass
-    
+
+    def put_file(self, container_id: str, dest_dir: str, filename: str, stream) -> bool:
+        """向容器内写入单个文件（默认未实现，支持归档接口的引擎覆盖此方法）"""
+        raise NotImplementedError
+
+    def get_file(self, container_id: str, path: str) -> Optional[bytes]:
+        """从容器内读出单个文件内容（默认未实现，支持归档接口的引擎覆盖此方法）"""
+        raise NotImplementedError
+
+    def open_shell(self, container_id: str, command: str = '/bin/sh'):
+        """打开容器内的持久交互式shell，返回可读写的socket
+        （默认未实现，支持的引擎覆盖此方法）"""
+        raise NotImplementedError
+
     # 镜像管理方法
     @abstractmethod
     def pull_image(self, image: str, tag: str = "latest") -> bool:
@@ -2,7 +2,9 @@ import docker
 from docker.errors import DockerException, NotFound, APIError
 from typing import Dict, List, Optional, Any
 from datetime import datetime
+import io
 import logging
+import tarfile
 
 from .base import ContainerEngine, ContainerConfig, ContainerInfo, ImageInfo
 
@@ -182,7 +184,47 @@ class DockerEngine(ContainerEngine):
         except Exception as e:
             logger.error(f"Failed to exec command in container {container_id}: {e}")
             return {'exit_code': -1, 'output': str(e)}
-    
+
+    def put_file(self, container_id: str, dest_dir: str, filename: str, stream) -> bool:
+        """通过put_archive把文件打成tar流写入容器，不经过shell"""
+        try:
+            container = self.client.containers.get(container_id)
+            data = stream.read()
+            buf = io.BytesIO()
+            with tarfile.open(fileobj=buf, mode='w') as tar:
+                info = tarfile.TarInfo(name=filename)
+                info.size = len(data)
+                tar.addfile(info, io.BytesIO(data))
+            buf.seek(0)
+            return bool(container.put_archive(dest_dir, buf))
+        except Exception as e:
+            logger.error(f"Failed to put file into container {container_id}: {e}")
+            return False
+
+    def get_file(self, container_id: str, path: str) -> Optional[bytes]:
+        """通过get_archive把单个文件以tar流读出，不经过shell，二进制安全"""
+        container = self.client.containers.get(container_id)
+        stream, _stat = container.get_archive(path)
+        buf = io.BytesIO()
+        for chunk in stream:
+            buf.write(chunk)
+        buf.seek(0)
+        with tarfile.open(fileobj=buf) as tar:
+            member = tar.next()
+            if member is None:
+                return None
+            extracted = tar.extractfile(member)
+            return extracted.read() if extracted else None
+
+    def open_shell(self, container_id: str, command: str = '/bin/sh'):
+        """打开容器内的持久交互式shell，返回可读写的socket"""
+        exec_id = self.client.api.exec_create(
+            container_id, command, stdin=True, tty=True
+        )['Id']
+        sock = self.client.api.exec_start(exec_id, socket=True, tty=True)
+        # socket=True返回SocketIO包装对象，取底层socket做双向读写
+        return getattr(sock, '_sock', sock)
+
     def pull_image(self, image: str, tag: str = "latest") -> bool:
         """拉取镜像"""
         try:
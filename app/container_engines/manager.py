@@ -1,5 +1,7 @@
 from typing import Dict, List, Optional, Any, Type
 import logging
+import threading
+import time
 from enum import Enum
 
 from .base import ContainerEngine, ContainerConfig, ContainerInfo, ImageInfo
@@ -17,11 +19,16 @@ class EngineType(Enum):
 
 class ContainerEngineManager:
     """容器引擎管理器 - 实现多态和统一接口"""
-    
+
+    # 引擎列表快照的TTL：list_engines会逐引擎ping，页面路由走快照即可
+    _ENGINES_CACHE_TTL = 5.0
+
     def __init__(self):
         self._engines: Dict[str, ContainerEngine] = {}
         self._engine_configs: Dict[str, Dict[str, Any]] = {}
         self._default_engine: Optional[str] = None
+        self._engines_cache = (0.0, None)  # (过期时刻, 快照)
+        self._engines_cache_lock = threading.Lock()
         
         # 引擎类型映射
         self._engine_classes: Dict[EngineType, Type[ContainerEngine]] = {
@@ -55,6 +62,7 @@ class ContainerEngineManager:
             if self._default_engine is None:
                 self._default_engine = name
             
+            self._invalidate_engines_cache()
             logger.info(f"Engine '{name}' ({engine_type.value}) added successfully")
             return True
             
@@ -73,6 +81,7 @@ class ContainerEngineManager:
                 if self._default_engine == name:
                     self._default_engine = next(iter(self._engines.keys())) if self._engines else None
                 
+                self._invalidate_engines_cache()
                 logger.info(f"Engine '{name}' removed successfully")
                 return True
             return False
@@ -100,10 +109,32 @@ class ContainerEngineManager:
             })
         return engines
     
+    def list_engines_cached(self) -> List[Dict[str, Any]]:
+        """带短TTL缓存的引擎列表快照
+
+        list_engines()对每个引擎做一次同步ping，页面路由逐请求调用时
+        一个迟钝的引擎socket会拖住整个worker；快照在TTL窗口内复用。
+        """
+        now = time.monotonic()
+        with self._engines_cache_lock:
+            expiry, snapshot = self._engines_cache
+            if snapshot is not None and expiry > now:
+                return snapshot
+        snapshot = self.list_engines()
+        with self._engines_cache_lock:
+            self._engines_cache = (now + self._ENGINES_CACHE_TTL, snapshot)
+        return snapshot
+
+    def _invalidate_engines_cache(self):
+        """引擎增删或默认引擎变化后使快照失效"""
+        with self._engines_cache_lock:
+            self._engines_cache = (0.0, None)
+
     def set_default_engine(self, name: str) -> bool:
         """设置默认引擎"""
         if name in self._engines:
             self._default_engine = name
+            self._invalidate_engines_cache()
             logger.info(f"Default engine set to '{name}'")
             return True
         return False
@@ -152,6 +183,27 @@ class ContainerEngineManager:
             return engine.remove_container(container_id, force)
         return False
     
+    def put_file(self, container_id: str, dest_dir: str, filename: str, stream, engine_name: str = None) -> bool:
+        """向容器内写入文件（引擎不支持归档接口时抛NotImplementedError）"""
+        engine = self.get_engine(engine_name)
+        if engine:
+            return engine.put_file(container_id, dest_dir, filename, stream)
+        return False
+
+    def get_file(self, container_id: str, path: str, engine_name: str = None) -> Optional[bytes]:
+        """从容器内读出文件内容（引擎不支持归档接口时抛NotImplementedError）"""
+        engine = self.get_engine(engine_name)
+        if engine:
+            return engine.get_file(container_id, path)
+        return None
+
+    def open_shell(self, container_id: str, command: str = '/bin/sh', engine_name: str = None):
+        """打开容器内的持久交互式shell（引擎不支持时抛NotImplementedError）"""
+        engine = self.get_engine(engine_name)
+        if engine:
+            return engine.open_shell(container_id, command)
+        return None
+
     def get_container(self, container_id: str, engine_name: str = None) -> Optional[ContainerInfo]:
         """获取容器信息"""
         engine = self.get_engine(engine_name)
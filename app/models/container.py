@@ -1,14 +1,31 @@
+from collections import OrderedDict
 from datetime import datetime
 from flask_sqlalchemy import SQLAlchemy
-import json
+from sqlalchemy import event, inspect
+import orjson
 
 # 使用全局db实例
 from app import db
+from app.models.user import User
+
+# to_dict配置字段的进程级缓存：键为(id, updated_at)，行更新后键变化自动失效
+_CONFIG_CACHE_MAX = 4096
+_config_dict_cache = OrderedDict()
+
+# 已停止状态集合：frozenset成员判断O(1)，不在每次调用时新建列表
+_STOPPED_STATES = frozenset({'stopped', 'exited'})
 
 class Container(db.Model):
     """容器模型"""
     __tablename__ = 'containers'
-    
+
+    # 热点过滤条件的复合索引：按用户+状态统计、按创建/更新时间排序
+    __table_args__ = (
+        db.Index('ix_containers_user_status', 'user_id', 'status'),
+        db.Index('ix_containers_created_at', 'created_at'),
+        db.Index('ix_containers_updated_at', 'updated_at'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     
     # 容器基本信息
@@ -46,6 +63,7 @@ class Container(db.Model):
     # 统计信息
     cpu_usage = db.Column(db.Float, default=0.0)  # CPU使用率
     memory_usage = db.Column(db.String(20), default='0MB')  # 内存使用量
+    port_count = db.Column(db.Integer, default=0)  # 端口数量（随端口映射同步维护，便于SQL聚合）
     
     # 时间戳
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
@@ -75,46 +93,47 @@ class Container(db.Model):
     def get_port_mappings(self):
         """获取端口映射"""
         try:
-            return json.loads(self.port_mappings)
-        except:
+            return orjson.loads(self.port_mappings)
+        except (ValueError, TypeError):
             return {}
-    
+
     def set_port_mappings(self, mappings):
-        """设置端口映射"""
-        self.port_mappings = json.dumps(mappings)
-    
+        """设置端口映射（空映射不做序列化，直接存None）"""
+        self.port_mappings = orjson.dumps(mappings).decode() if mappings else None
+        self.port_count = len(mappings) if mappings else 0
+
     def get_volume_mappings(self):
         """获取卷挂载"""
         try:
-            return json.loads(self.volume_mappings)
-        except:
+            return orjson.loads(self.volume_mappings)
+        except (ValueError, TypeError):
             return {}
-    
+
     def set_volume_mappings(self, mappings):
         """设置卷挂载"""
-        self.volume_mappings = json.dumps(mappings)
-    
+        self.volume_mappings = orjson.dumps(mappings).decode() if mappings else None
+
     def get_environment_vars(self):
         """获取环境变量"""
         try:
-            return json.loads(self.environment_vars)
-        except:
+            return orjson.loads(self.environment_vars)
+        except (ValueError, TypeError):
             return {}
-    
+
     def set_environment_vars(self, env_vars):
         """设置环境变量"""
-        self.environment_vars = json.dumps(env_vars)
-    
+        self.environment_vars = orjson.dumps(env_vars).decode() if env_vars else None
+
     def get_devices(self):
         """获取设备映射"""
         try:
-            return json.loads(self.devices)
-        except:
+            return orjson.loads(self.devices)
+        except (ValueError, TypeError):
             return []
-    
+
     def set_devices(self, device_list):
         """设置设备映射"""
-        self.devices = json.dumps(device_list)
+        self.devices = orjson.dumps(device_list).decode() if device_list else None
     
     def update_status(self, status):
         """更新容器状态"""
@@ -142,15 +161,26 @@ class Container(db.Model):
     
     def get_port_count(self):
         """获取端口数量"""
+        if self.port_count is not None:
+            return self.port_count
+        # 兼容旧数据：列为空时回退到解析端口映射
         return len(self.get_port_mappings())
     
+    @staticmethod
+    def status_counts_for_user(user_id):
+        """按状态统计用户容器数量（一条GROUP BY聚合，不物化容器行）"""
+        rows = db.session.query(
+            Container.status, db.func.count(Container.id)
+        ).filter(Container.user_id == user_id).group_by(Container.status).all()
+        return dict(rows)
+
     def is_running(self):
         """检查是否正在运行"""
         return self.status == 'running'
     
     def is_stopped(self):
         """检查是否已停止"""
-        return self.status in ['stopped', 'exited']
+        return self.status in _STOPPED_STATES
     
     def can_start(self):
         """检查是否可以启动"""
@@ -184,7 +214,19 @@ class Container(db.Model):
         }
         
         if include_config:
-            data.update({
+            data.update(self._config_dict())
+
+        return data
+
+    def _config_dict(self):
+        """to_dict的配置字段；JSON列解析开销大且仅随updated_at变化，做LRU缓存
+
+        status/cpu_usage等实时字段不走缓存，轮询路径上未变更的行可直接复用。
+        """
+        key = (self.id, self.updated_at.timestamp() if self.updated_at else None)
+        cached = _config_dict_cache.get(key)
+        if cached is None:
+            cached = {
                 'port_mappings': self.get_port_mappings(),
                 'volume_mappings': self.get_volume_mappings(),
                 'environment_vars': self.get_environment_vars(),
@@ -196,9 +238,13 @@ class Container(db.Model):
                 'working_dir': self.working_dir,
                 'user': self.user,
                 'restart_policy': self.restart_policy
-            })
-        
-        return data
+            }
+            _config_dict_cache[key] = cached
+            if len(_config_dict_cache) > _CONFIG_CACHE_MAX:
+                _config_dict_cache.popitem(last=False)
+        else:
+            _config_dict_cache.move_to_end(key)
+        return cached
     
     @staticmethod
     def get_by_container_id(container_id):
@@ -234,4 +280,33 @@ class Container(db.Model):
         return Container.query.filter_by(status=status).count()
     
     def __repr__(self):
-        return f'<Container {self.name}>'
\ No newline at end of file
+        return f'<Container {self.name}>'
+
+def _adjust_user_ports(connection, user_id, delta):
+    """增量调整用户的已用端口计数"""
+    if not user_id or not delta:
+        return
+    connection.execute(
+        User.__table__.update()
+        .where(User.__table__.c.id == user_id)
+        .values(used_ports=User.__table__.c.used_ports + delta)
+    )
+
+@event.listens_for(Container, 'after_insert')
+def _container_inserted(mapper, connection, target):
+    """容器创建后累加所属用户的端口计数"""
+    _adjust_user_ports(connection, target.user_id, target.port_count or 0)
+
+@event.listens_for(Container, 'after_delete')
+def _container_deleted(mapper, connection, target):
+    """容器删除后扣减所属用户的端口计数"""
+    _adjust_user_ports(connection, target.user_id, -(target.port_count or 0))
+
+@event.listens_for(Container, 'after_update')
+def _container_updated(mapper, connection, target):
+    """端口映射变化时按差值同步用户的端口计数"""
+    history = inspect(target).attrs.port_count.history
+    if not history.has_changes():
+        return
+    old_count = (history.deleted[0] or 0) if history.deleted else 0
+    _adjust_user_ports(connection, target.user_id, (target.port_count or 0) - old_count)
\ No newline at end of file
@@ -1,5 +1,7 @@
 from datetime import datetime
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import bindparam, lambda_stmt, select
+from sqlalchemy.ext.hybrid import hybrid_property
 import json
 
 # 使用全局db实例
@@ -8,28 +10,31 @@ from app import db
 class Engine(db.Model):
     """容器引擎模型"""
     __tablename__ = 'engines'
-    
+
+    # 状态标志位（打包到单个flags列，缩小行宽并支持位运算过滤）
+    ACTIVE = 1 << 0  # 是否激活
+    DEFAULT = 1 << 1  # 是否为默认引擎
+    CONNECTED = 1 << 2  # 是否已连接
+
     id = db.Column(db.Integer, primary_key=True)
-    
+
     # 引擎基本信息
     name = db.Column(db.String(100), unique=True, nullable=False, index=True)  # 引擎名称
     display_name = db.Column(db.String(255), nullable=False)  # 显示名称
     engine_type = db.Column(db.String(50), nullable=False)  # 引擎类型: docker, podman, lxc
-    
+
     # 连接配置
     host = db.Column(db.String(255))  # 主机地址
     port = db.Column(db.Integer)  # 端口
-    
+
     # 认证配置 (JSON格式存储)
     auth_config = db.Column(db.Text, default='{}')  # 认证配置
-    
+
     # 引擎选项 (JSON格式存储)
     options = db.Column(db.Text, default='{}')  # 引擎选项
-    
-    # 引擎状态
-    is_active = db.Column(db.Boolean, default=True)  # 是否激活
-    is_default = db.Column(db.Boolean, default=False)  # 是否为默认引擎
-    is_connected = db.Column(db.Boolean, default=False)  # 是否已连接
+
+    # 引擎状态 (位掩码存储)
+    flags = db.Column(db.SmallInteger, default=ACTIVE, nullable=False)  # 状态标志位
     
     # 统计信息
     container_count = db.Column(db.Integer, default=0)  # 容器数量
@@ -52,6 +57,8 @@ class Engine(db.Model):
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
     
     def __init__(self, **kwargs):
+        # 默认激活（setter依赖flags已初始化）
+        self.flags = Engine.ACTIVE
         super(Engine, self).__init__(**kwargs)
         if not self.auth_config:
             self.auth_config = '{}'
@@ -59,7 +66,53 @@ class Engine(db.Model):
             self.options = '{}'
         if not self.system_info:
             self.system_info = '{}'
-    
+
+    def _set_flag(self, flag, value):
+        """设置或清除标志位"""
+        if value:
+            self.flags = (self.flags or 0) | flag
+        else:
+            self.flags = (self.flags or 0) & ~flag
+
+    @hybrid_property
+    def is_active(self):
+        """是否激活"""
+        return bool(self.flags & Engine.ACTIVE)
+
+    @is_active.setter
+    def is_active(self, value):
+        self._set_flag(Engine.ACTIVE, value)
+
+    @is_active.expression
+    def is_active(cls):
+        return cls.flags.op('&')(cls.ACTIVE) != 0
+
+    @hybrid_property
+    def is_default(self):
+        """是否为默认引擎"""
+        return bool(self.flags & Engine.DEFAULT)
+
+    @is_default.setter
+    def is_default(self, value):
+        self._set_flag(Engine.DEFAULT, value)
+
+    @is_default.expression
+    def is_default(cls):
+        return cls.flags.op('&')(cls.DEFAULT) != 0
+
+    @hybrid_property
+    def is_connected(self):
+        """是否已连接"""
+        return bool(self.flags & Engine.CONNECTED)
+
+    @is_connected.setter
+    def is_connected(self, value):
+        self._set_flag(Engine.CONNECTED, value)
+
+    @is_connected.expression
+    def is_connected(cls):
+        return cls.flags.op('&')(cls.CONNECTED) != 0
+
     def get_auth_config(self):
         """获取认证配置"""
         try:
@@ -175,35 +228,46 @@ class Engine(db.Model):
     
     @staticmethod
     def get_by_name(name):
-        """根据名称获取引擎"""
-        return Engine.query.filter_by(name=name).first()
-    
+        """根据名称获取引擎（语句编译结果会被缓存）"""
+        stmt = lambda_stmt(lambda: select(Engine).where(Engine.name == bindparam('name')))
+        return db.session.execute(stmt, {'name': name}).scalar_one_or_none()
+
     @staticmethod
     def get_default_engine():
         """获取默认引擎"""
-        return Engine.query.filter_by(is_default=True).first()
-    
+        stmt = lambda_stmt(lambda: select(Engine).where(Engine.flags.op('&')(Engine.DEFAULT) != 0))
+        return db.session.execute(stmt).scalars().first()
+
     @staticmethod
     def get_active_engines():
         """获取激活的引擎"""
-        return Engine.query.filter_by(is_active=True).all()
-    
+        stmt = lambda_stmt(lambda: select(Engine).where(Engine.flags.op('&')(Engine.ACTIVE) != 0))
+        return db.session.execute(stmt).scalars().all()
+
     @staticmethod
     def get_connected_engines():
-        """获取已连接的引擎"""
-        return Engine.query.filter_by(is_active=True, is_connected=True).all()
-    
+        """获取已连接的引擎（激活且已连接，一次位测试完成）"""
+        mask = Engine.ACTIVE | Engine.CONNECTED
+        stmt = lambda_stmt(lambda: select(Engine).where(Engine.flags.op('&')(mask) == mask))
+        return db.session.execute(stmt).scalars().all()
+
     @staticmethod
     def get_engines_by_type(engine_type):
         """根据类型获取引擎"""
-        return Engine.query.filter_by(engine_type=engine_type, is_active=True).all()
-    
+        return Engine.query.filter(
+            Engine.engine_type == engine_type,
+            Engine.flags.op('&')(Engine.ACTIVE) != 0
+        ).all()
+
     @staticmethod
     def set_default_engine(engine_id):
         """设置默认引擎"""
         # 清除所有默认标记
-        Engine.query.update({'is_default': False})
-        
+        Engine.query.update(
+            {Engine.flags: Engine.flags.op('&')(~Engine.DEFAULT)},
+            synchronize_session=False
+        )
+
         # 设置新的默认引擎
         engine = Engine.query.get(engine_id)
         if engine:
@@ -218,13 +282,14 @@ class Engine(db.Model):
         return db.session.query(
             Engine.engine_type,
             db.func.count(Engine.id)
-        ).filter_by(is_active=True).group_by(Engine.engine_type).all()
-    
+        ).filter(Engine.flags.op('&')(Engine.ACTIVE) != 0).group_by(Engine.engine_type).all()
+
     @staticmethod
     def get_engine_stats():
         """获取引擎统计信息"""
-        total_engines = Engine.query.filter_by(is_active=True).count()
-        connected_engines = Engine.query.filter_by(is_active=True, is_connected=True).count()
+        mask = Engine.ACTIVE | Engine.CONNECTED
+        total_engines = Engine.query.filter(Engine.flags.op('&')(Engine.ACTIVE) != 0).count()
+        connected_engines = Engine.query.filter(Engine.flags.op('&')(mask) == mask).count()
         total_containers = db.session.query(db.func.sum(Engine.container_count)).scalar() or 0
         total_images = db.session.query(db.func.sum(Engine.image_count)).scalar() or 0
         total_networks = db.session.query(db.func.sum(Engine.network_count)).scalar() or 0
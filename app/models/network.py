@@ -1,13 +1,22 @@
 from datetime import datetime
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.orm import selectinload
 import json
 
 # 使用全局db实例
 from app import db
 
+# 系统保留网络名称
+_SYSTEM_NETWORKS = frozenset({'bridge', 'host', 'none', 'default'})
+
 class Network(db.Model):
     """网络模型"""
     __tablename__ = 'networks'
+
+    # 按用户+激活状态统计的复合索引，覆盖仪表盘聚合
+    __table_args__ = (
+        db.Index('ix_networks_user_active', 'user_id', 'is_active'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     
@@ -74,8 +83,7 @@ class Network(db.Model):
     
     def is_system_network(self):
         """检查是否为系统网络"""
-        system_networks = ['bridge', 'host', 'none', 'default']
-        return self.name in system_networks
+        return self.name in _SYSTEM_NETWORKS
     
     def can_delete(self):
         """检查是否可以删除"""
@@ -108,6 +116,11 @@ class Network(db.Model):
         
         return data
     
+    @staticmethod
+    def get_with_containers(network_id):
+        """获取网络并批量预加载容器（用于include_containers=True的序列化，避免N+1查询）"""
+        return Network.query.options(selectinload(Network.containers)).get(network_id)
+
     @staticmethod
     def get_by_network_id(network_id):
         """根据网络ID获取网络"""
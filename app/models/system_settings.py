@@ -1,4 +1,5 @@
 from datetime import datetime
+from flask import g
 from flask_sqlalchemy import SQLAlchemy
 import json
 
@@ -196,12 +197,15 @@ class SystemSettings(db.Model):
     
     @staticmethod
     def get_settings():
-        """获取系统设置（单例模式）"""
-        settings = SystemSettings.query.first()
-        if not settings:
-            settings = SystemSettings()
-            db.session.add(settings)
-            db.session.commit()
+        """获取系统设置（单例模式，同一请求内缓存在g上，避免重复查询）"""
+        settings = getattr(g, '_system_settings', None)
+        if settings is None:
+            settings = SystemSettings.query.first()
+            if not settings:
+                settings = SystemSettings()
+                db.session.add(settings)
+                db.session.commit()
+            g._system_settings = settings
         return settings
     
     @staticmethod
@@ -8,6 +8,11 @@ from app import db
 class Template(db.Model):
     """模板模型"""
     __tablename__ = 'templates'
+
+    # 公开+激活是模板列表的固定过滤条件
+    __table_args__ = (
+        db.Index('ix_templates_public_active', 'is_public', 'is_active'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     
@@ -172,10 +177,11 @@ class Template(db.Model):
         """获取用户可用的模板（公开模板 + 用户自己的模板）"""
         return Template.query.filter(
             db.or_(
-                Template.is_public == True,
+                Template.is_public,
                 Template.created_by == user_id
-            )
-        ).filter_by(is_active=True).all()
+            ),
+            Template.is_active
+        ).all()
     
     @staticmethod
     def get_by_category(category):
@@ -197,13 +203,14 @@ class Template(db.Model):
                 Template.name.contains(keyword),
                 Template.display_name.contains(keyword),
                 Template.description.contains(keyword)
-            )
-        ).filter_by(is_active=True)
-        
+            ),
+            Template.is_active
+        )
+
         if user_id:
             query = query.filter(
                 db.or_(
-                    Template.is_public == True,
+                    Template.is_public,
                     Template.created_by == user_id
                 )
             )
@@ -2,7 +2,8 @@ from datetime import datetime
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
-import json
+import hmac
+import orjson
 
 # 使用全局db实例
 from app import db
@@ -10,7 +11,12 @@ from app import db
 class User(UserMixin, db.Model):
     """用户模型"""
     __tablename__ = 'users'
-    
+
+    # 注册统计按created_at过滤，建立索引
+    __table_args__ = (
+        db.Index('ix_users_created_at', 'created_at'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False, index=True)
     email = db.Column(db.String(120), unique=True, nullable=False, index=True)
@@ -23,6 +29,11 @@ class User(UserMixin, db.Model):
     # 用户资源
     coins = db.Column(db.Integer, default=100, nullable=False)  # 金币
     
+    # 资源使用计数：used_ports由Container的ORM事件增量维护，准入检查无需聚合查询；
+    # used_storage暂无数据来源（容器未记录磁盘占用），与上游一致保持0占位
+    used_ports = db.Column(db.Integer, default=0, nullable=False)  # 已使用端口数量
+    used_storage = db.Column(db.Float, default=0.0, nullable=False)  # 已使用存储空间(GB)
+
     # 资源限制
     max_containers = db.Column(db.Integer, default=10, nullable=False)  # 最大容器数量
     max_ports = db.Column(db.Integer, default=20, nullable=False)  # 最大端口数量
@@ -40,9 +51,9 @@ class User(UserMixin, db.Model):
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
     last_login = db.Column(db.DateTime)
     
-    # 关系
-    containers = db.relationship('Container', backref='owner', lazy='dynamic', cascade='all, delete-orphan')
-    networks = db.relationship('Network', backref='owner', lazy='dynamic', cascade='all, delete-orphan')
+    # 关系 (selectin: 集合一次加载并缓存在实例上，列表端点可批量预取)
+    containers = db.relationship('Container', backref='owner', lazy='selectin', cascade='all, delete-orphan')
+    networks = db.relationship('Network', backref='owner', lazy='selectin', cascade='all, delete-orphan')
     
     def __init__(self, **kwargs):
         super(User, self).__init__(**kwargs)
@@ -59,70 +70,80 @@ class User(UserMixin, db.Model):
     
     def check_password(self, password):
         """检查密码"""
-        return check_password_hash(self.password_hash, password)
-    
+        try:
+            return check_password_hash(self.password_hash, password)
+        except ValueError:
+            # 哈希格式无法识别时的回退路径：恒定时间比较，避免时序侧信道；
+            # 先编码为bytes，str参数含非ASCII时compare_digest会抛TypeError
+            return hmac.compare_digest(
+                self.password_hash.encode('utf-8'), password.encode('utf-8')
+            )
+    
+    def _cached_json(self, column_name, default):
+        """解析JSON列并缓存在实例上，避免每次访问重复json.loads"""
+        cache_key = '_' + column_name + '_cache'
+        if cache_key not in self.__dict__:
+            try:
+                value = orjson.loads(getattr(self, column_name))
+            except (ValueError, TypeError):
+                value = default
+            self.__dict__[cache_key] = value
+        return self.__dict__[cache_key]
+
     def get_host_privileges(self):
         """获取主机权限"""
-        try:
-            return json.loads(self.host_privileges)
-        except:
-            return {}
-    
+        return self._cached_json('host_privileges', {})
+
     def set_host_privileges(self, privileges):
         """设置主机权限"""
-        self.host_privileges = json.dumps(privileges)
-    
+        self.host_privileges = orjson.dumps(privileges).decode()
+        self._host_privileges_cache = privileges
+
     def get_device_access(self):
         """获取设备访问权限"""
-        try:
-            return json.loads(self.device_access)
-        except:
-            return []
-    
+        return self._cached_json('device_access', [])
+
     def set_device_access(self, devices):
         """设置设备访问权限"""
-        self.device_access = json.dumps(devices)
-    
+        self.device_access = orjson.dumps(devices).decode()
+        self._device_access_cache = devices
+
     def get_gpu_access(self):
         """获取GPU访问权限"""
-        try:
-            return json.loads(self.gpu_access)
-        except:
-            return []
-    
+        return self._cached_json('gpu_access', [])
+
     def set_gpu_access(self, gpus):
         """设置GPU访问权限"""
-        self.gpu_access = json.dumps(gpus)
+        self.gpu_access = orjson.dumps(gpus).decode()
+        self._gpu_access_cache = gpus
     
     def get_container_count(self):
         """获取用户容器数量"""
-        return self.containers.count()
+        return len(self.containers)
     
     def get_used_ports(self):
         """获取用户已使用的端口数量"""
-        used_ports = 0
-        for container in self.containers:
-            port_mappings = container.get_port_mappings()
-            used_ports += len(port_mappings)
-        return used_ports
-    
+        return self.used_ports or 0
+
     def get_used_storage(self):
-        """获取用户已使用的存储空间(GB)"""
-        # 这里需要实际计算容器使用的存储空间
-        # 暂时返回0，实际实现时需要查询容器存储使用情况
-        return 0
-    
+        """获取用户已使用的存储空间(GB)
+
+        目前没有任何路径写入used_storage（容器不记录磁盘占用），
+        该值恒为0，与上游的占位实现语义一致。
+        """
+        return self.used_storage or 0
+
     def can_create_container(self):
         """检查是否可以创建新容器"""
         return self.get_container_count() < self.max_containers
-    
+
     def can_use_ports(self, port_count):
         """检查是否可以使用指定数量的端口"""
-        return self.get_used_ports() + port_count <= self.max_ports
-    
+        return (self.used_ports or 0) + port_count <= self.max_ports
+
     def can_use_storage(self, storage_gb):
         """检查是否可以使用指定存储空间"""
-        return self.get_used_storage() + storage_gb <= self.max_storage
+        return (self.used_storage or 0) + storage_gb <= self.max_storage
     
     def deduct_coins(self, amount):
         """扣除金币"""
@@ -139,8 +160,12 @@ class User(UserMixin, db.Model):
         """更新最后登录时间"""
         self.last_login = datetime.utcnow()
     
-    def to_dict(self, include_sensitive=False):
-        """转换为字典"""
+    def to_dict(self, include_sensitive=False, container_count=None, used_ports=None):
+        """转换为字典
+
+        列表端点可以通过container_count/used_ports传入预先聚合好的统计值，
+        避免逐用户加载容器集合。
+        """
         data = {
             'id': self.id,
             'username': self.username,
@@ -156,8 +181,8 @@ class User(UserMixin, db.Model):
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None,
             'last_login': self.last_login.isoformat() if self.last_login else None,
-            'container_count': self.get_container_count(),
-            'used_ports': self.get_used_ports(),
+            'container_count': container_count if container_count is not None else self.get_container_count(),
+            'used_ports': used_ports if used_ports is not None else self.get_used_ports(),
             'used_storage': self.get_used_storage()
         }
         
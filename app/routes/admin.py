@@ -1,6 +1,10 @@
-from flask import Blueprint, render_template, request, jsonify, redirect, url_for, flash
+from flask import Blueprint, render_template, request, jsonify, redirect, url_for, flash, current_app
 from flask_login import login_required, current_user
-from functools import wraps
+from functools import wraps, lru_cache
+import hashlib
+from datetime import datetime, time
+from sqlalchemy import case
+from sqlalchemy.orm import load_only, raiseload
 
 from app import db
 from app.models import User, Container, Network, Template, SystemSettings, Engine
@@ -8,6 +12,10 @@ from app.container_engines.manager import engine_manager, EngineType
 
 admin_bp = Blueprint('admin', __name__)
 
+def sum_case(condition):
+    """SUM(CASE WHEN condition THEN 1 ELSE 0 END)，用于单次查询内的条件计数"""
+    return db.func.sum(case((condition, 1), else_=0))
+
 def admin_required(f):
     """管理员权限装饰器"""
     @wraps(f)
@@ -25,30 +33,50 @@ def admin_required(f):
 @admin_required
 def dashboard():
     """管理员仪表板"""
-    # 系统统计
+    # 系统统计（每张表一次分组聚合查询）
+    user_row = db.session.query(
+        db.func.count(User.id),
+        sum_case(User.is_active),
+        sum_case(User.is_admin)
+    ).one()
+    container_row = db.session.query(
+        db.func.count(Container.id),
+        sum_case(Container.status == 'running'),
+        sum_case(Container.status.in_(['stopped', 'exited']))
+    ).one()
+    network_row = db.session.query(
+        db.func.count(Network.id),
+        sum_case(Network.is_active)
+    ).one()
+    template_row = db.session.query(
+        db.func.count(Template.id),
+        sum_case(Template.is_public),
+        sum_case(Template.is_active)
+    ).one()
+
     stats = {
         'users': {
-            'total': User.query.count(),
-            'active': User.query.filter_by(is_active=True).count(),
-            'admin': User.query.filter_by(is_admin=True).count()
+            'total': user_row[0],
+            'active': int(user_row[1] or 0),
+            'admin': int(user_row[2] or 0)
         },
         'containers': {
-            'total': Container.query.count(),
-            'running': Container.query.filter_by(status='running').count(),
-            'stopped': Container.query.filter(Container.status.in_(['stopped', 'exited'])).count()
+            'total': container_row[0],
+            'running': int(container_row[1] or 0),
+            'stopped': int(container_row[2] or 0)
         },
         'networks': {
-            'total': Network.query.count(),
-            'active': Network.query.filter_by(is_active=True).count()
+            'total': network_row[0],
+            'active': int(network_row[1] or 0)
         },
         'templates': {
-            'total': Template.query.count(),
-            'public': Template.query.filter_by(is_public=True).count(),
-            'active': Template.query.filter_by(is_active=True).count()
+            'total': template_row[0],
+            'public': int(template_row[1] or 0),
+            'active': int(template_row[2] or 0)
         },
         'engines': len(engine_manager.list_engines())
     }
-    
+
     return render_template('admin/dashboard.html', stats=stats)
 
 # 用户管理
@@ -67,23 +95,62 @@ def list_users():
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 20, type=int)
     search = request.args.get('search', '').strip()
-    
+
+    # 根据两张表的版本信息计算ETag，数据未变化时直接304返回，
+    # 跳过整页的查询和序列化
+    user_version = db.session.query(
+        db.func.max(User.updated_at), db.func.count(User.id)
+    ).one()
+    container_version = db.session.query(
+        db.func.max(Container.updated_at), db.func.count(Container.id)
+    ).one()
+    etag = hashlib.md5(
+        f"{user_version}:{container_version}:{page}:{per_page}:{search}".encode()
+    ).hexdigest()
+    if request.if_none_match.contains(etag):
+        return '', 304
+
     query = User.query
     
     if search:
+        # 前缀匹配(LIKE 'x%')可以利用username/email上的索引；
+        # contains生成LIKE '%x%'只能全表扫描。autoescape转义%/_通配符
         query = query.filter(
-            (User.username.contains(search)) |
-            (User.email.contains(search))
+            (User.username.startswith(search, autoescape=True)) |
+            (User.email.startswith(search, autoescape=True))
         )
     
-    users = query.order_by(User.created_at.desc()).paginate(
+    # 开发环境下让任何意外的懒加载直接报错，暴露隐藏的N+1
+    if current_app.config.get('RAISELOAD_DEV'):
+        query = query.options(raiseload('*'))
+
+    # 只加载序列化需要的列，跳过password_hash和权限JSON等宽文本列
+    users = query.options(load_only(
+        User.id, User.username, User.email, User.is_active, User.is_admin,
+        User.coins, User.max_containers, User.max_ports, User.max_storage,
+        User.max_cpu, User.max_memory, User.used_storage,
+        User.created_at, User.updated_at, User.last_login
+    )).order_by(User.created_at.desc()).paginate(
         page=page, per_page=per_page, error_out=False
     )
-    
-    return jsonify({
+
+    # 一次聚合查询计算本页用户的容器数和端口数，代替逐用户统计
+    user_ids = [u.id for u in users.items]
+    usage = {}
+    if user_ids:
+        rows = db.session.query(
+            Container.user_id,
+            db.func.count(Container.id),
+            db.func.coalesce(db.func.sum(Container.port_count), 0)
+        ).filter(Container.user_id.in_(user_ids)).group_by(Container.user_id).all()
+        usage = {user_id: (containers, ports) for user_id, containers, ports in rows}
+
+    response = jsonify({
         'success': True,
         'data': {
-            'users': [u.to_dict() for u in users.items],
+            'users': [u.to_dict(container_count=usage.get(u.id, (0, 0))[0],
+                                used_ports=usage.get(u.id, (0, 0))[1])
+                      for u in users.items],
             'pagination': {
                 'page': page,
                 'per_page': per_page,
@@ -94,6 +161,8 @@ def list_users():
             }
         }
     })
+    response.set_etag(etag)
+    return response
 
 @admin_bp.route('/api/users/<int:user_id>', methods=['PUT'])
 @login_required
@@ -102,30 +171,22 @@ def update_user(user_id):
     """更新用户信息API"""
     user = User.query.get_or_404(user_id)
     data = request.get_json()
-    
+
+    # 可直接批量更新的标量列（JSON权限列仍走实例setter）
+    updatable_columns = (
+        'email', 'is_active', 'is_admin', 'coins',
+        'max_containers', 'max_ports', 'max_storage', 'max_cpu', 'max_memory'
+    )
+
     try:
-        # 更新基本信息
-        if 'email' in data:
-            user.email = data['email']
-        if 'is_active' in data:
-            user.is_active = data['is_active']
-        if 'is_admin' in data:
-            user.is_admin = data['is_admin']
-        
-        # 更新资源限制
-        if 'coins' in data:
-            user.coins = data['coins']
-        if 'max_containers' in data:
-            user.max_containers = data['max_containers']
-        if 'max_ports' in data:
-            user.max_ports = data['max_ports']
-        if 'max_storage' in data:
-            user.max_storage = data['max_storage']
-        if 'max_cpu' in data:
-            user.max_cpu = data['max_cpu']
-        if 'max_memory' in data:
-            user.max_memory = data['max_memory']
-        
+        # 基本信息和资源限制：一条参数化UPDATE完成
+        values = {key: data[key] for key in updatable_columns if key in data}
+        if values:
+            values['updated_at'] = datetime.utcnow()
+            db.session.query(User).filter(User.id == user_id).update(
+                values, synchronize_session=False
+            )
+
         # 更新权限设置
         if 'host_privileges' in data:
             user.set_host_privileges(data['host_privileges'])
@@ -133,9 +194,11 @@ def update_user(user_id):
             user.set_device_access(data['device_access'])
         if 'gpu_access' in data:
             user.set_gpu_access(data['gpu_access'])
-        
+
         db.session.commit()
-        
+        # 批量UPDATE绕过了会话同步，刷新实例以返回最新值
+        db.session.refresh(user)
+
         return jsonify({
             'success': True,
             'message': '用户信息更新成功',
@@ -179,8 +242,11 @@ def delete_user(user_id):
     if user.id == current_user.id:
         return jsonify({'success': False, 'message': '不能删除自己'}), 400
     
-    # 检查用户是否有容器
-    if user.get_container_count() > 0:
+    # 检查用户是否有容器（EXISTS在首行命中即可短路，无需COUNT全表）
+    has_containers = db.session.query(
+        Container.query.filter_by(user_id=user_id).exists()
+    ).scalar()
+    if has_containers:
         return jsonify({'success': False, 'message': '用户还有容器，无法删除'}), 400
     
     try:
@@ -201,15 +267,19 @@ def settings():
     """系统设置页面"""
     return render_template('admin/settings.html')
 
+@lru_cache(maxsize=1)
+def _cached_settings_dict():
+    """缓存系统设置的字典结果（缓存字典而非ORM实例，避免跨请求的脱离实例问题）"""
+    return SystemSettings.get_settings().to_dict(include_sensitive=True)
+
 @admin_bp.route('/api/settings', methods=['GET'])
 @login_required
 @admin_required
 def get_settings():
     """获取系统设置API"""
-    settings = SystemSettings.get_settings()
     return jsonify({
         'success': True,
-        'data': settings.to_dict(include_sensitive=True)
+        'data': _cached_settings_dict()
     })
 
 @admin_bp.route('/api/settings', methods=['PUT'])
@@ -218,15 +288,16 @@ def get_settings():
 def update_settings():
     """更新系统设置API"""
     data = request.get_json()
-    
+
     try:
         settings = SystemSettings.update_settings(data)
+        _cached_settings_dict.cache_clear()
         return jsonify({
             'success': True,
             'message': '设置更新成功',
             'data': settings.to_dict()
         })
-        
+
     except Exception as e:
         return jsonify({'success': False, 'message': f'设置更新失败: {str(e)}'}), 500
 
@@ -284,11 +355,16 @@ def add_engine():
         engine.set_auth_config(data.get('auth_config', {}))
         engine.set_options(data.get('options', {}))
         
-        # 如果设置为默认引擎，清除其他默认标记
-        if engine.is_default:
-            Engine.query.update({'is_default': False})
-        
         db.session.add(engine)
+        db.session.flush()
+
+        # 如果设置为默认引擎，清除其他引擎的默认标记（排除新行，避免重复写入）
+        if engine.is_default:
+            Engine.query.filter(Engine.id != engine.id).update(
+                {Engine.flags: Engine.flags.op('&')(~Engine.DEFAULT)},
+                synchronize_session=False
+            )
+
         db.session.commit()
         
         return jsonify({
@@ -338,7 +414,8 @@ def templates():
 @admin_required
 def list_all_templates():
     """获取所有模板API"""
-    templates = Template.query.order_by(Template.created_at.desc()).all()
+    # 分批取行（每批500），避免大模板表一次性全部进入会话
+    templates = Template.query.order_by(Template.created_at.desc()).yield_per(500)
     return jsonify({
         'success': True,
         'data': [t.to_dict() for t in templates]
@@ -379,31 +456,57 @@ def monitor():
 @admin_required
 def system_stats():
     """系统统计API"""
+    # 用DateTime类型的边界值比较，保证命中created_at索引而非逐行隐式转换
+    today = datetime.combine(datetime.utcnow().date(), time.min)
+
+    # 每张表一次分组聚合查询
+    user_row = db.session.query(
+        db.func.count(User.id),
+        sum_case(User.is_active),
+        sum_case(User.is_admin),
+        sum_case(User.created_at >= today)
+    ).one()
+    container_row = db.session.query(
+        db.func.count(Container.id),
+        sum_case(Container.status == 'running'),
+        sum_case(Container.status.in_(['stopped', 'exited'])),
+        sum_case(Container.created_at >= today)
+    ).one()
+    network_row = db.session.query(
+        db.func.count(Network.id),
+        sum_case(Network.is_active)
+    ).one()
+    template_row = db.session.query(
+        db.func.count(Template.id),
+        sum_case(Template.is_public),
+        sum_case(Template.is_active)
+    ).one()
+
     stats = {
         'users': {
-            'total': User.query.count(),
-            'active': User.query.filter_by(is_active=True).count(),
-            'admin': User.query.filter_by(is_admin=True).count(),
-            'new_today': User.query.filter(User.created_at >= datetime.utcnow().date()).count()
+            'total': user_row[0],
+            'active': int(user_row[1] or 0),
+            'admin': int(user_row[2] or 0),
+            'new_today': int(user_row[3] or 0)
         },
         'containers': {
-            'total': Container.query.count(),
-            'running': Container.query.filter_by(status='running').count(),
-            'stopped': Container.query.filter(Container.status.in_(['stopped', 'exited'])).count(),
-            'created_today': Container.query.filter(Container.created_at >= datetime.utcnow().date()).count()
+            'total': container_row[0],
+            'running': int(container_row[1] or 0),
+            'stopped': int(container_row[2] or 0),
+            'created_today': int(container_row[3] or 0)
         },
         'networks': {
-            'total': Network.query.count(),
-            'active': Network.query.filter_by(is_active=True).count()
+            'total': network_row[0],
+            'active': int(network_row[1] or 0)
         },
         'templates': {
-            'total': Template.query.count(),
-            'public': Template.query.filter_by(is_public=True).count(),
-            'active': Template.query.filter_by(is_active=True).count()
+            'total': template_row[0],
+            'public': int(template_row[1] or 0),
+            'active': int(template_row[2] or 0)
         },
         'engines': {
             'total': len(engine_manager.list_engines()),
-            'connected': len([e for e in engine_manager.list_engines() if e['is_connected']])
+            'connected': sum(1 for e in engine_manager.list_engines_cached() if e['is_connected'])
         }
     }
     
@@ -1,21 +1,56 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, current_app, g, request, jsonify
 from flask_login import login_required, current_user
-from datetime import datetime
-import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+import base64
+import io
+import os
+import shlex
+import threading
+import time
+from sqlalchemy import case, delete, update
+from sqlalchemy.orm import raiseload, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
 
 from app import db
-from app.models import Container, Network, Template, Engine
+from app.models import User, Container, Network, Template, Engine
 from app.container_engines.manager import engine_manager, EngineType
 from app.container_engines.base import ContainerConfig
 
 api_bp = Blueprint('api', __name__)
 
+# 判定"已停止"的状态集合；frozenset成员判断O(1)，避免热路径上反复建临时列表
+_STOPPED_STATES = frozenset({'stopped', 'exited'})
+
+# base64回退上传的分块大小：编码后64KB，远低于ARG_MAX，内存占用恒定
+_UPLOAD_CHUNK = 48 * 1024
+
+# 引擎批量list结果的短TTL缓存：前端每隔几秒轮询一次，引擎状态变化没那么快，
+# 多个并发仪表盘页签在TTL窗口内合并为一次引擎RTT
+_ENGINE_LIST_TTL = 2.0
+_engine_list_cache = {}  # engine_name -> (过期时刻, 容器列表)
+_engine_list_lock = threading.Lock()
+
+def _list_engine_containers_cached(engine_name):
+    """带短TTL缓存的引擎容器批量查询"""
+    now = time.monotonic()
+    with _engine_list_lock:
+        cached = _engine_list_cache.get(engine_name)
+        if cached and cached[0] > now:
+            return cached[1]
+    containers = engine_manager.list_containers(all=True, engine_name=engine_name)
+    with _engine_list_lock:
+        _engine_list_cache[engine_name] = (now + _ENGINE_LIST_TTL, containers)
+    return containers
+
 # 容器管理API
 @api_bp.route('/containers/user', methods=['GET'])
 @login_required
 def get_user_containers_api():
     """获取用户容器列表（增强版）"""
     # 获取查询参数
+    page = request.args.get('page', 1, type=int)
+    per_page = request.args.get('per_page', 50, type=int)
     status = request.args.get('status')
     engine_name = request.args.get('engine')
     search = request.args.get('search', '').strip()
@@ -27,6 +62,10 @@ def get_user_containers_api():
     else:
         # 普通用户只获取自己的容器
         query = Container.query.filter_by(user_id=current_user.id)
+
+    # 开发环境下让意外的关系懒加载直接抛错，防止序列化路径退化成N+1
+    if current_app.config.get('RAISELOAD_DEV'):
+        query = query.options(raiseload('*'))
     
     # 应用筛选条件
     if status:
@@ -44,44 +83,107 @@ def get_user_containers_api():
             )
         )
     
-    # 获取所有容器（用于统计）
-    all_containers = query.all()
+    # 只取当前页容器（统计由下方的SQL聚合完成，无需物化全部行）
+    all_containers = query.order_by(Container.updated_at.desc()).limit(
+        per_page).offset((page - 1) * per_page).all()
     
     # 更新容器状态（从引擎获取实时信息）
-    for container in all_containers:
-        try:
-            engine_container = engine_manager.get_container(container.container_id, container.engine_name)
-            if engine_container:
-                container.update_status(engine_container.status)
-                container.ip_address = engine_container.ip_address
-                container.update_stats(engine_container.cpu_usage, engine_container.memory_usage)
-        except Exception as e:
-            # 如果获取引擎信息失败，使用数据库中的状态
-            pass
-    
+    # 逐容器查询引擎是典型的N+1：每个容器一次阻塞RPC。
+    # 改为按引擎批量list一次，建立container_id索引后O(1)查找，
+    # RTT从N次降为引擎数次；不同引擎的批量调用仍并发执行。
+    # 几秒内刚刷新过的行视为新鲜，直接跳过，稳态轮询几乎不产生引擎RTT
+    poll_threshold = datetime.utcnow() - timedelta(seconds=5)
+    poll_targets = [
+        c for c in all_containers
+        if not c.updated_at or c.updated_at < poll_threshold
+    ]
+    if poll_targets:
+        engine_names = {c.engine_name for c in poll_targets}
+        engine_index = {}
+        with ThreadPoolExecutor(max_workers=min(8, len(engine_names))) as executor:
+            futures = {
+                executor.submit(_list_engine_containers_cached, name): name
+                for name in engine_names
+            }
+            for future in as_completed(futures):
+                try:
+                    for ec in future.result():
+                        engine_index[ec.id] = ec
+                except Exception:
+                    # 引擎不可达时跳过，对应容器沿用数据库中的状态
+                    pass
+
+        # 逐属性赋值会触发脏跟踪并在flush时产生逐行UPDATE；
+        # 改为收集变更后按主键批量UPDATE（executemany），一次往返写回
+        now = datetime.utcnow()
+        updates = []
+        for container in poll_targets:
+            engine_container = engine_index.get(container.container_id)
+            if not engine_container:
+                continue
+            new_status = engine_container.status
+            values = {
+                'id': container.id,
+                'status': new_status,
+                'ip_address': engine_container.ip_address,
+                'cpu_usage': engine_container.cpu_usage if engine_container.cpu_usage is not None else container.cpu_usage,
+                'memory_usage': engine_container.memory_usage if engine_container.memory_usage is not None else container.memory_usage,
+                'started_at': container.started_at,
+                'stopped_at': container.stopped_at,
+            }
+            # 保持update_status中的启停时间戳语义
+            if new_status == 'running' and container.status != 'running':
+                values['started_at'] = now
+            elif new_status in _STOPPED_STATES and container.status == 'running':
+                values['stopped_at'] = now
+            updates.append(values)
+            # 同步内存对象供下方序列化；set_committed_value不会把对象标脏
+            for key, value in values.items():
+                if key != 'id':
+                    set_committed_value(container, key, value)
+
+        if updates:
+            db.session.execute(update(Container), updates)
+
+    # 先序列化再提交：commit会使实例过期（expire_on_commit），
+    # 否则逐容器refresh并丢掉上面set_committed_value同步的字段
+    containers_payload = [c.to_dict() for c in all_containers]
     db.session.commit()
     
-    # 计算统计信息
+    # 计算统计信息和资源使用（聚合下推到SQL，一条COUNT/SUM查询代替Python遍历）
+    row = query.with_entities(
+        db.func.count(Container.id),
+        db.func.sum(case((Container.status == 'running', 1), else_=0)),
+        db.func.sum(case((Container.status.in_(_STOPPED_STATES), 1), else_=0)),
+        db.func.sum(case((Container.status == 'paused', 1), else_=0)),
+        db.func.coalesce(db.func.sum(Container.cpu_limit), 0),
+        db.func.coalesce(db.func.sum(Container.memory_limit), 0),
+    ).one()
+
     stats = {
-        'total': len(all_containers),
-        'running': len([c for c in all_containers if c.status == 'running']),
-        'stopped': len([c for c in all_containers if c.status in ['stopped', 'exited']]),
-        'paused': len([c for c in all_containers if c.status == 'paused'])
+        'total': int(row[0] or 0),
+        'running': int(row[1] or 0),
+        'stopped': int(row[2] or 0),
+        'paused': int(row[3] or 0)
     }
-    
-    # 计算资源使用
-    total_cpu = sum(c.cpu_limit or 0 for c in all_containers if c.cpu_limit)
-    total_memory = sum(c.memory_limit or 0 for c in all_containers if c.memory_limit)
+    total_cpu = row[4] or 0
+    total_memory = row[5] or 0
     
     # 返回数据
     return jsonify({
         'success': True,
         'data': {
-            'containers': [c.to_dict() for c in all_containers],
+            'containers': containers_payload,
             'stats': stats,
             'resource_usage': {
                 'total_cpu': total_cpu,
                 'total_memory': total_memory
+            },
+            'pagination': {
+                'page': page,
+                'per_page': per_page,
+                'total': stats['total'],
+                'pages': (stats['total'] + per_page - 1) // per_page
             }
         }
     })
@@ -92,11 +194,16 @@ def list_containers():
     """获取容器列表"""
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 20, type=int)
+    exact_count = request.args.get('exact_count', 0, type=int)
     status = request.args.get('status')
     engine_name = request.args.get('engine')
     
     query = Container.query
-    
+
+    # 开发环境下让意外的关系懒加载直接抛错，防止序列化路径退化成N+1
+    if current_app.config.get('RAISELOAD_DEV'):
+        query = query.options(raiseload('*'))
+
     # 非管理员只能看到自己的容器
     if not current_user.is_admin:
         query = query.filter_by(user_id=current_user.id)
@@ -109,22 +216,29 @@ def list_containers():
     if engine_name:
         query = query.filter_by(engine_name=engine_name)
     
-    # 分页
-    containers = query.order_by(Container.updated_at.desc()).paginate(
-        page=page, per_page=per_page, error_out=False
-    )
-    
+    # 分页：paginate()每次都会额外跑一遍全过滤集的COUNT(*)，大表上开销明显。
+    # 默认多取一行推断has_next即可；仅在exact_count=1时才做精确计数
+    items = query.order_by(Container.updated_at.desc()).limit(
+        per_page + 1).offset((page - 1) * per_page).all()
+    has_next = len(items) > per_page
+    items = items[:per_page]
+
+    total = pages = None
+    if exact_count:
+        total = query.order_by(None).count()
+        pages = (total + per_page - 1) // per_page
+
     return jsonify({
         'success': True,
         'data': {
-            'containers': [c.to_dict() for c in containers.items],
+            'containers': [c.to_dict() for c in items],
             'pagination': {
                 'page': page,
                 'per_page': per_page,
-                'total': containers.total,
-                'pages': containers.pages,
-                'has_next': containers.has_next,
-                'has_prev': containers.has_prev
+                'total': total,
+                'pages': pages,
+                'has_next': has_next,
+                'has_prev': page > 1
             }
         }
     })
@@ -150,8 +264,12 @@ def create_container():
     if Container.get_by_name(name):
         return jsonify({'success': False, 'message': '容器名称已存在'}), 400
     
-    # 检查用户是否可以创建容器
-    if not current_user.can_create_container():
+    # 检查用户是否可以创建容器（数量对比下推到SQL，检查和插入处于同一事务，
+    # 避免读取-插入之间的竞态窗口）
+    quota_ok = db.session.query(
+        db.func.count(Container.id) < current_user.max_containers
+    ).filter(Container.user_id == current_user.id).scalar()
+    if not quota_ok:
         return jsonify({'success': False, 'message': '已达到最大容器数量限制'}), 403
     
     # 检查端口限制
@@ -241,14 +359,32 @@ def get_container(container_id):
     if container.user_id != current_user.id and not current_user.is_admin:
         return jsonify({'success': False, 'message': '权限不足'}), 403
     
-    # 从引擎获取实时状态
+    # 从引擎获取实时状态；只写回真正变化的字段，无变化时不产生UPDATE和提交
     engine_container = engine_manager.get_container(container.container_id, container.engine_name)
     if engine_container:
-        container.update_status(engine_container.status)
-        container.ip_address = engine_container.ip_address
-        container.update_stats(engine_container.cpu_usage, engine_container.memory_usage)
-        db.session.commit()
-    
+        changes = {}
+        if engine_container.status != container.status:
+            changes['status'] = engine_container.status
+            # 保持update_status中的启停时间戳语义
+            if engine_container.status == 'running':
+                changes['started_at'] = datetime.utcnow()
+            elif engine_container.status in _STOPPED_STATES and container.status == 'running':
+                changes['stopped_at'] = datetime.utcnow()
+        if engine_container.ip_address != container.ip_address:
+            changes['ip_address'] = engine_container.ip_address
+        if engine_container.cpu_usage is not None and engine_container.cpu_usage != container.cpu_usage:
+            changes['cpu_usage'] = engine_container.cpu_usage
+        if engine_container.memory_usage is not None and engine_container.memory_usage != container.memory_usage:
+            changes['memory_usage'] = engine_container.memory_usage
+        if changes:
+            db.session.execute(
+                update(Container).where(Container.id == container.id).values(**changes)
+            )
+            db.session.commit()
+            # 同步内存对象供序列化，不再触发脏跟踪
+            for key, value in changes.items():
+                set_committed_value(container, key, value)
+
     return jsonify({
         'success': True,
         'data': container.to_dict()
@@ -292,7 +428,8 @@ def stop_container(container_id):
         return jsonify({'success': False, 'message': '容器当前状态不允许停止'}), 400
     
     try:
-        timeout = request.json.get('timeout', 10) if request.is_json else 10
+        body = request.get_json(silent=True) or {}
+        timeout = body.get('timeout', 10)
         success = engine_manager.stop_container(container.container_id, timeout, container.engine_name)
         if success:
             container.update_status('stopped')
@@ -314,7 +451,8 @@ def restart_container(container_id):
         return jsonify({'success': False, 'message': '权限不足'}), 403
     
     try:
-        timeout = request.json.get('timeout', 10) if request.is_json else 10
+        body = request.get_json(silent=True) or {}
+        timeout = body.get('timeout', 10)
         success = engine_manager.restart_container(container.container_id, timeout, container.engine_name)
         if success:
             container.update_status('running')
@@ -336,7 +474,8 @@ def delete_container(container_id):
         return jsonify({'success': False, 'message': '权限不足'}), 403
     
     try:
-        force = request.json.get('force', False) if request.is_json else False
+        body = request.get_json(silent=True) or {}
+        force = body.get('force', False)
         
         # 从引擎删除容器
         success = engine_manager.remove_container(container.container_id, force, container.engine_name)
@@ -360,37 +499,65 @@ def batch_start_containers():
     if not container_ids:
         return jsonify({'success': False, 'message': '未选择容器'}), 400
     
-    results = []
+    # current_user是LocalProxy，逐行访问属性都要经过代理转发，提升为局部变量
+    uid = current_user.id
+    is_admin = current_user.is_admin
     success_count = 0
-    
+
+    # 一次IN查询取出全部容器，属主过滤直接下推到SQL：
+    # 无权限的行根本不会被取出和实例化
+    container_query = Container.query.filter(Container.id.in_(container_ids))
+    if not is_admin:
+        container_query = container_query.filter(Container.user_id == uid)
+    containers = {c.id: c for c in container_query.all()}
+
+    # 先做权限与状态预检，通过的容器进入待执行队列
+    result_map = {}
+    pending = []
     for container_id in container_ids:
-        try:
-            container = Container.query.get(container_id)
-            if not container:
-                results.append({'id': container_id, 'success': False, 'message': '容器不存在'})
-                continue
-            
-            # 检查权限
-            if container.user_id != current_user.id and not current_user.is_admin:
-                results.append({'id': container_id, 'success': False, 'message': '权限不足'})
-                continue
-            
-            if not container.can_start():
-                results.append({'id': container_id, 'success': False, 'message': '容器当前状态不允许启动'})
-                continue
-            
-            success = engine_manager.start_container(container.container_id, container.engine_name)
-            if success:
-                container.update_status('running')
-                success_count += 1
-                results.append({'id': container_id, 'success': True, 'message': '容器启动成功'})
-            else:
-                results.append({'id': container_id, 'success': False, 'message': '容器启动失败'})
-        except Exception as e:
-            results.append({'id': container_id, 'success': False, 'message': f'容器启动失败: {str(e)}'})
-    
+        container = containers.get(container_id)
+        if not container:
+            result_map[container_id] = {'id': container_id, 'success': False, 'message': '容器不存在或无权限'}
+        elif not container.can_start():
+            result_map[container_id] = {'id': container_id, 'success': False, 'message': '容器当前状态不允许启动'}
+        else:
+            pending.append(container)
+
+    # 引擎调用是阻塞I/O，串行执行耗时N个RTT；线程池并发执行，ORM只在请求线程更新
+    now = datetime.utcnow()
+    state_updates = []
+    if pending:
+        with ThreadPoolExecutor(max_workers=min(32, len(pending))) as executor:
+            futures = {
+                executor.submit(engine_manager.start_container,
+                                c.container_id, c.engine_name): c
+                for c in pending
+            }
+            for future in as_completed(futures):
+                container = futures[future]
+                try:
+                    success = future.result()
+                except Exception as e:
+                    result_map[container.id] = {'id': container.id, 'success': False, 'message': f'容器启动失败: {str(e)}'}
+                    continue
+                if success:
+                    state_updates.append({
+                        'id': container.id,
+                        'status': 'running',
+                        'started_at': now if container.status != 'running' else container.started_at,
+                    })
+                    success_count += 1
+                    result_map[container.id] = {'id': container.id, 'success': True, 'message': '容器启动成功'}
+                else:
+                    result_map[container.id] = {'id': container.id, 'success': False, 'message': '容器启动失败'}
+
+    # 状态变更汇总为一条按主键的批量UPDATE，代替逐对象脏跟踪+逐行flush，最后只提交一次
+    if state_updates:
+        db.session.execute(update(Container), state_updates)
+
+    results = [result_map[cid] for cid in container_ids if cid in result_map]
     db.session.commit()
-    
+
     return jsonify({
         'success': success_count > 0,
         'message': f'批量启动完成，成功 {success_count}/{len(container_ids)} 个容器',
@@ -408,37 +575,65 @@ def batch_stop_containers():
     if not container_ids:
         return jsonify({'success': False, 'message': '未选择容器'}), 400
     
-    results = []
+    # current_user是LocalProxy，逐行访问属性都要经过代理转发，提升为局部变量
+    uid = current_user.id
+    is_admin = current_user.is_admin
     success_count = 0
-    
+
+    # 一次IN查询取出全部容器，属主过滤直接下推到SQL：
+    # 无权限的行根本不会被取出和实例化
+    container_query = Container.query.filter(Container.id.in_(container_ids))
+    if not is_admin:
+        container_query = container_query.filter(Container.user_id == uid)
+    containers = {c.id: c for c in container_query.all()}
+
+    # 先做权限与状态预检，通过的容器进入待执行队列
+    result_map = {}
+    pending = []
     for container_id in container_ids:
-        try:
-            container = Container.query.get(container_id)
-            if not container:
-                results.append({'id': container_id, 'success': False, 'message': '容器不存在'})
-                continue
-            
-            # 检查权限
-            if container.user_id != current_user.id and not current_user.is_admin:
-                results.append({'id': container_id, 'success': False, 'message': '权限不足'})
-                continue
-            
-            if not container.can_stop():
-                results.append({'id': container_id, 'success': False, 'message': '容器当前状态不允许停止'})
-                continue
-            
-            success = engine_manager.stop_container(container.container_id, timeout, container.engine_name)
-            if success:
-                container.update_status('stopped')
-                success_count += 1
-                results.append({'id': container_id, 'success': True, 'message': '容器停止成功'})
-            else:
-                results.append({'id': container_id, 'success': False, 'message': '容器停止失败'})
-        except Exception as e:
-            results.append({'id': container_id, 'success': False, 'message': f'容器停止失败: {str(e)}'})
-    
+        container = containers.get(container_id)
+        if not container:
+            result_map[container_id] = {'id': container_id, 'success': False, 'message': '容器不存在或无权限'}
+        elif not container.can_stop():
+            result_map[container_id] = {'id': container_id, 'success': False, 'message': '容器当前状态不允许停止'}
+        else:
+            pending.append(container)
+
+    # 引擎调用是阻塞I/O，线程池并发执行，ORM只在请求线程更新
+    now = datetime.utcnow()
+    state_updates = []
+    if pending:
+        with ThreadPoolExecutor(max_workers=min(32, len(pending))) as executor:
+            futures = {
+                executor.submit(engine_manager.stop_container,
+                                c.container_id, timeout, c.engine_name): c
+                for c in pending
+            }
+            for future in as_completed(futures):
+                container = futures[future]
+                try:
+                    success = future.result()
+                except Exception as e:
+                    result_map[container.id] = {'id': container.id, 'success': False, 'message': f'容器停止失败: {str(e)}'}
+                    continue
+                if success:
+                    state_updates.append({
+                        'id': container.id,
+                        'status': 'stopped',
+                        'stopped_at': now if container.status == 'running' else container.stopped_at,
+                    })
+                    success_count += 1
+                    result_map[container.id] = {'id': container.id, 'success': True, 'message': '容器停止成功'}
+                else:
+                    result_map[container.id] = {'id': container.id, 'success': False, 'message': '容器停止失败'}
+
+    # 状态变更汇总为一条按主键的批量UPDATE，最后只提交一次
+    if state_updates:
+        db.session.execute(update(Container), state_updates)
+
+    results = [result_map[cid] for cid in container_ids if cid in result_map]
     db.session.commit()
-    
+
     return jsonify({
         'success': success_count > 0,
         'message': f'批量停止完成，成功 {success_count}/{len(container_ids)} 个容器',
@@ -456,31 +651,61 @@ def batch_restart_containers():
     if not container_ids:
         return jsonify({'success': False, 'message': '未选择容器'}), 400
     
-    results = []
+    # current_user是LocalProxy，逐行访问属性都要经过代理转发，提升为局部变量
+    uid = current_user.id
+    is_admin = current_user.is_admin
     success_count = 0
-    
+
+    # 一次IN查询取出全部容器，属主过滤直接下推到SQL：
+    # 无权限的行根本不会被取出和实例化
+    container_query = Container.query.filter(Container.id.in_(container_ids))
+    if not is_admin:
+        container_query = container_query.filter(Container.user_id == uid)
+    containers = {c.id: c for c in container_query.all()}
+
+    # 先做权限预检，通过的容器进入待执行队列
+    result_map = {}
+    pending = []
     for container_id in container_ids:
-        try:
-            container = Container.query.get(container_id)
-            if not container:
-                results.append({'id': container_id, 'success': False, 'message': '容器不存在'})
-                continue
-            
-            # 检查权限
-            if container.user_id != current_user.id and not current_user.is_admin:
-                results.append({'id': container_id, 'success': False, 'message': '权限不足'})
-                continue
-            
-            success = engine_manager.restart_container(container.container_id, timeout, container.engine_name)
-            if success:
-                container.update_status('running')
-                success_count += 1
-                results.append({'id': container_id, 'success': True, 'message': '容器重启成功'})
-            else:
-                results.append({'id': container_id, 'success': False, 'message': '容器重启失败'})
-        except Exception as e:
-            results.append({'id': container_id, 'success': False, 'message': f'容器重启失败: {str(e)}'})
-    
+        container = containers.get(container_id)
+        if not container:
+            result_map[container_id] = {'id': container_id, 'success': False, 'message': '容器不存在或无权限'}
+        else:
+            pending.append(container)
+
+    # 引擎调用是阻塞I/O，线程池并发执行，ORM只在请求线程更新
+    now = datetime.utcnow()
+    state_updates = []
+    if pending:
+        with ThreadPoolExecutor(max_workers=min(32, len(pending))) as executor:
+            futures = {
+                executor.submit(engine_manager.restart_container,
+                                c.container_id, timeout, c.engine_name): c
+                for c in pending
+            }
+            for future in as_completed(futures):
+                container = futures[future]
+                try:
+                    success = future.result()
+                except Exception as e:
+                    result_map[container.id] = {'id': container.id, 'success': False, 'message': f'容器重启失败: {str(e)}'}
+                    continue
+                if success:
+                    state_updates.append({
+                        'id': container.id,
+                        'status': 'running',
+                        'started_at': now if container.status != 'running' else container.started_at,
+                    })
+                    success_count += 1
+                    result_map[container.id] = {'id': container.id, 'success': True, 'message': '容器重启成功'}
+                else:
+                    result_map[container.id] = {'id': container.id, 'success': False, 'message': '容器重启失败'}
+
+    # 状态变更汇总为一条按主键的批量UPDATE，最后只提交一次
+    if state_updates:
+        db.session.execute(update(Container), state_updates)
+
+    results = [result_map[cid] for cid in container_ids if cid in result_map]
     db.session.commit()
     
     return jsonify({
@@ -500,33 +725,71 @@ def batch_delete_containers():
     if not container_ids:
         return jsonify({'success': False, 'message': '未选择容器'}), 400
     
-    results = []
+    # current_user是LocalProxy，逐行访问属性都要经过代理转发，提升为局部变量
+    uid = current_user.id
+    is_admin = current_user.is_admin
     success_count = 0
-    
+
+    # 一次IN查询取出全部容器，属主过滤直接下推到SQL：
+    # 无权限的行根本不会被取出和实例化
+    container_query = Container.query.filter(Container.id.in_(container_ids))
+    if not is_admin:
+        container_query = container_query.filter(Container.user_id == uid)
+    containers = {c.id: c for c in container_query.all()}
+
+    # 先做权限预检，通过的容器进入待执行队列
+    result_map = {}
+    pending = []
     for container_id in container_ids:
-        try:
-            container = Container.query.get(container_id)
-            if not container:
-                results.append({'id': container_id, 'success': False, 'message': '容器不存在'})
-                continue
-            
-            # 检查权限
-            if container.user_id != current_user.id and not current_user.is_admin:
-                results.append({'id': container_id, 'success': False, 'message': '权限不足'})
-                continue
-            
-            # 从引擎删除容器
-            success = engine_manager.remove_container(container.container_id, force, container.engine_name)
-            if success or force:
-                # 从数据库删除
-                db.session.delete(container)
-                success_count += 1
-                results.append({'id': container_id, 'success': True, 'message': '容器删除成功'})
-            else:
-                results.append({'id': container_id, 'success': False, 'message': '容器删除失败'})
-        except Exception as e:
-            results.append({'id': container_id, 'success': False, 'message': f'容器删除失败: {str(e)}'})
-    
+        container = containers.get(container_id)
+        if not container:
+            result_map[container_id] = {'id': container_id, 'success': False, 'message': '容器不存在或无权限'}
+        else:
+            pending.append(container)
+
+    # 引擎调用是阻塞I/O，线程池并发执行，ORM只在请求线程更新
+    deleted = []
+    if pending:
+        with ThreadPoolExecutor(max_workers=min(32, len(pending))) as executor:
+            futures = {
+                executor.submit(engine_manager.remove_container,
+                                c.container_id, force, c.engine_name): c
+                for c in pending
+            }
+            for future in as_completed(futures):
+                container = futures[future]
+                try:
+                    success = future.result()
+                except Exception as e:
+                    result_map[container.id] = {'id': container.id, 'success': False, 'message': f'容器删除失败: {str(e)}'}
+                    continue
+                if success or force:
+                    deleted.append(container)
+                    success_count += 1
+                    result_map[container.id] = {'id': container.id, 'success': True, 'message': '容器删除成功'}
+                else:
+                    result_map[container.id] = {'id': container.id, 'success': False, 'message': '容器删除失败'}
+
+    # 一条批量DELETE代替逐对象db.session.delete，跳过逐行flush开销；
+    # 绕过了after_delete事件，用户端口计数在此按用户汇总后手动扣减
+    if deleted:
+        port_deltas = {}
+        for container in deleted:
+            port_deltas[container.user_id] = port_deltas.get(container.user_id, 0) + (container.port_count or 0)
+        db.session.execute(
+            delete(Container).where(Container.id.in_([c.id for c in deleted]))
+        )
+        for user_id, ports in port_deltas.items():
+            if ports:
+                db.session.execute(
+                    update(User)
+                    .where(User.id == user_id)
+                    .values(used_ports=User.used_ports - ports)
+                )
+        for container in deleted:
+            db.session.expunge(container)
+
+    results = [result_map[cid] for cid in container_ids if cid in result_map]
     db.session.commit()
     
     return jsonify({
@@ -763,19 +1026,24 @@ def batch_delete_networks():
     if not network_ids:
         return jsonify({'success': False, 'message': '未选择网络'}), 400
     
+    # current_user是LocalProxy，逐行访问属性都要经过代理转发，提升为局部变量
+    uid = current_user.id
+    is_admin = current_user.is_admin
     results = []
     success_count = 0
-    
+
+    # 一次IN查询取出全部网络，属主过滤直接下推到SQL：
+    # 无权限的行根本不会被取出和实例化
+    network_query = Network.query.filter(Network.id.in_(network_ids))
+    if not is_admin:
+        network_query = network_query.filter(Network.user_id == uid)
+    networks = {n.id: n for n in network_query.all()}
+
     for network_id in network_ids:
         try:
-            network = Network.query.get(network_id)
+            network = networks.get(network_id)
             if not network:
-                results.append({'id': network_id, 'success': False, 'message': '网络不存在'})
-                continue
-            
-            # 检查权限
-            if network.user_id != current_user.id and not current_user.is_admin:
-                results.append({'id': network_id, 'success': False, 'message': '权限不足'})
+                results.append({'id': network_id, 'success': False, 'message': '网络不存在或无权限'})
                 continue
             
             if not network.can_delete():
@@ -863,14 +1131,14 @@ def list_images():
             return jsonify({
                 'success': True,
                 'data': {
-                    engine_name: [img.__dict__ for img in images]
+                    engine_name: [img.to_dict() for img in images]
                 }
             })
         else:
             all_images = engine_manager.list_all_images()
-            # 转换ImageInfo对象为字典
+            # 转换ImageInfo对象为字典（to_dict只导出API字段，不经__dict__全量拷贝）
             for engine, images in all_images.items():
-                all_images[engine] = [img.__dict__ for img in images]
+                all_images[engine] = [img.to_dict() for img in images]
             
             return jsonify({
                 'success': True,
@@ -911,7 +1179,8 @@ def delete_image(image_id):
         return jsonify({'success': False, 'message': '权限不足'}), 403
     
     engine_name = request.args.get('engine')
-    force = request.json.get('force', False) if request.is_json else False
+    body = request.get_json(silent=True) or {}
+    force = body.get('force', False)
     
     try:
         success = engine_manager.remove_image(image_id, force, engine_name)
@@ -929,19 +1198,42 @@ def list_templates():
     """获取模板列表"""
     category = request.args.get('category')
     search = request.args.get('search')
-    
+    limit = request.args.get('limit', 0, type=int)
+    after = request.args.get('after', 0, type=int)
+
+    # 可见性条件统一下推到SQL（分类分支原来在Python侧过滤）；
+    # creator关系selectin预加载，否则to_dict逐个懒加载creator.username是N+1
+    query = Template.query.options(selectinload(Template.creator)).filter(
+        db.or_(Template.is_public, Template.created_by == current_user.id),
+        Template.is_active
+    )
+
     if search:
-        templates = Template.search_templates(search, current_user.id)
+        query = query.filter(
+            db.or_(
+                Template.name.contains(search),
+                Template.display_name.contains(search),
+                Template.description.contains(search)
+            )
+        )
     elif category:
-        templates = Template.get_by_category(category)
-        # 过滤用户可见的模板
-        templates = [t for t in templates if t.is_public or t.created_by == current_user.id]
+        query = query.filter(Template.category == category)
+
+    # 键集分页（可选）：带limit时按id游标翻页，响应规模有上界；
+    # 不带limit保持原有一次性返回的契约
+    next_cursor = None
+    if limit > 0:
+        templates = query.filter(Template.id > after).order_by(
+            Template.id).limit(limit).all()
+        if len(templates) == limit:
+            next_cursor = templates[-1].id
     else:
-        templates = Template.get_available_templates(current_user.id)
-    
+        templates = query.all()
+
     return jsonify({
         'success': True,
-        'data': [t.to_dict() for t in templates]
+        'data': [t.to_dict() for t in templates],
+        'next_cursor': next_cursor
     })
 
 @api_bp.route('/templates/<int:template_id>', methods=['GET'])
@@ -963,14 +1255,26 @@ def get_template(template_id):
 @login_required
 def delete_template(template_id):
     """删除模板"""
-    template = Template.query.get_or_404(template_id)
-    
-    # 检查权限
-    if template.created_by != current_user.id and not current_user.is_admin:
+    # 权限判断只需要created_by一列，不用先物化完整Template对象
+    owner = db.session.query(Template.created_by).filter(
+        Template.id == template_id
+    ).scalar()
+    if owner is None:
+        return jsonify({'success': False, 'message': '模板不存在'}), 404
+
+    if owner != current_user.id and not current_user.is_admin:
         return jsonify({'success': False, 'message': '权限不足'}), 403
-    
+
     try:
-        db.session.delete(template)
+        # 与批量删除路径一致：先解除容器对模板的引用，再按条件直接DELETE
+        db.session.execute(
+            update(Container)
+            .where(Container.template_id == template_id)
+            .values(template_id=None)
+        )
+        Template.query.filter(Template.id == template_id).delete(
+            synchronize_session=False
+        )
         db.session.commit()
         return jsonify({'success': True, 'message': '模板删除成功'})
     except Exception as e:
@@ -987,33 +1291,52 @@ def batch_delete_templates():
     if not template_ids:
         return jsonify({'success': False, 'message': '未选择模板'}), 400
     
+    # 一次SELECT取回(id, created_by)做权限预检，再一条批量DELETE收尾；
+    # 查询数从2N+1降为常数，不随批量大小增长。
+    # 预检只读列元组，no_autoflush确保这条SELECT不触发中间flush
+    with db.session.no_autoflush:
+        owner_map = dict(
+            db.session.query(Template.id, Template.created_by)
+            .filter(Template.id.in_(template_ids)).all()
+        )
+
+    uid = current_user.id
+    is_admin = current_user.is_admin
     results = []
-    success_count = 0
-    
+    allowed = []
     for template_id in template_ids:
-        try:
-            template = Template.query.get(template_id)
-            if not template:
-                results.append({'id': template_id, 'success': False, 'message': '模板不存在'})
-                continue
-            
-            # 检查权限
-            if template.created_by != current_user.id and not current_user.is_admin:
-                results.append({'id': template_id, 'success': False, 'message': '权限不足'})
-                continue
-            
-            # 删除模板
-            db.session.delete(template)
-            success_count += 1
+        owner = owner_map.get(template_id)
+        if owner is None:
+            results.append({'id': template_id, 'success': False, 'message': '模板不存在'})
+        elif owner != uid and not is_admin:
+            results.append({'id': template_id, 'success': False, 'message': '权限不足'})
+        else:
+            allowed.append(template_id)
             results.append({'id': template_id, 'success': True, 'message': '模板删除成功'})
-            
+
+    success_count = len(allowed)
+    if allowed:
+        try:
+            # 先解除容器对模板的引用（逐对象删除时ORM会做同样的事）
+            db.session.execute(
+                update(Container)
+                .where(Container.template_id.in_(allowed))
+                .values(template_id=None)
+            )
+            # Core层DELETE完全绕开unit of work，与上面的容器批量删除路径一致
+            db.session.execute(
+                delete(Template).where(Template.id.in_(allowed))
+            )
+            db.session.commit()
         except Exception as e:
-            results.append({'id': template_id, 'success': False, 'message': f'模板删除失败: {str(e)}'})
-    
-    if success_count > 0:
-        db.session.commit()
-    else:
-        db.session.rollback()
+            db.session.rollback()
+            success_count = 0
+            failed = set(allowed)
+            results = [
+                {'id': r['id'], 'success': False, 'message': f'模板删除失败: {str(e)}'}
+                if r['id'] in failed else r
+                for r in results
+            ]
     
     return jsonify({
         'success': success_count > 0,
@@ -1042,6 +1365,30 @@ def check_engines_health():
         'data': health_status
     })
 
+
+def _file_container():
+    """取当前用户用于文件操作的运行中容器，每请求缓存在g上
+
+    返回(container, error_response)二元组：容器不可用时container为None，
+    error_response为可直接return的错误响应。
+    """
+    if not hasattr(g, '_file_container'):
+        container = Container.query.filter_by(
+            user_id=current_user.id, status='running'
+        ).first()
+        if container is not None:
+            g._file_container = (container, None)
+        else:
+            # 区分"没有容器"和"容器未运行"两种提示
+            has_any = db.session.query(Container.id).filter_by(
+                user_id=current_user.id
+            ).first()
+            if has_any:
+                g._file_container = (None, (jsonify({'success': False, 'message': '容器未运行'}), 400))
+            else:
+                g._file_container = (None, (jsonify({'success': False, 'message': '没有可用的容器'}), 404))
+    return g._file_container
+
 # 文件管理API
 @api_bp.route('/files', methods=['GET'])
 @login_required
@@ -1050,55 +1397,49 @@ def list_files():
     path = request.args.get('path', '/')
     
     try:
-        # 获取当前用户的容器
-        containers = Container.query.filter_by(user_id=current_user.id).all()
-        if not containers:
-            return jsonify({'success': False, 'message': '没有可用的容器'}), 404
+        # 获取当前用户的运行中容器（每请求只查一次）
+        container, error = _file_container()
+        if error:
+            return error
         
-        # 使用第一个可用的容器进行文件操作
-        container = containers[0]
-        if not container.is_running():
-            return jsonify({'success': False, 'message': '容器未运行'}), 400
-        
-        # 列出目录内容
-        command = f"ls -la '{path}'"
+        # 列出目录内容：find -printf输出tab分隔的结构化字段，
+        # 不会像解析ls -la那样被含空格的文件名错位；-mindepth 1自动排除.和..，
+        # 路径经shlex.quote处理，顺带封住shell注入口
+        command = (
+            f"find {shlex.quote(path)} -maxdepth 1 -mindepth 1 "
+            "-printf '%y\\t%s\\t%T@\\t%M\\t%f\\n'"
+        )
         result = engine_manager.exec_command(
-            container.container_id, 
-            command, 
+            container.container_id,
+            command,
             container.engine_name
         )
-        
+
         if result['exit_code'] == 0:
             files = []
-            lines = result['output'].strip().split('\n')[1:]  # 跳过第一行总计
-            
-            for line in lines:
+            for line in result['output'].splitlines():
                 if not line.strip():
                     continue
-                    
-                parts = line.split()
-                if len(parts) >= 9:
-                    permissions = parts[0]
-                    size = parts[4] if parts[4].isdigit() else '0'
-                    modified = ' '.join(parts[5:8])
-                    name = ' '.join(parts[8:])
-                    
-                    # 跳过.和..目录
-                    if name in ['.', '..']:
-                        continue
-                    
-                    file_type = 'directory' if permissions.startswith('d') else 'file'
-                    file_path = os.path.join(path, name)
-                    
-                    files.append({
-                        'name': name,
-                        'type': file_type,
-                        'path': file_path,
-                        'size': int(size) if size.isdigit() else 0,
-                        'modified': modified,
-                        'permissions': permissions
-                    })
-            
+
+                try:
+                    type_char, size, mtime, permissions, name = line.split('\t', 4)
+                except ValueError:
+                    continue
+
+                try:
+                    modified = datetime.fromtimestamp(float(mtime)).strftime('%Y-%m-%d %H:%M')
+                except ValueError:
+                    modified = mtime
+
+                files.append({
+                    'name': name,
+                    'type': 'directory' if type_char == 'd' else 'file',
+                    'path': os.path.join(path, name),
+                    'size': int(size) if size.isdigit() else 0,
+                    'modified': modified,
+                    'permissions': permissions
+                })
+
             return jsonify({
                 'success': True,
                 'data': files,
@@ -1119,14 +1460,10 @@ def get_file_content():
         return jsonify({'success': False, 'message': '文件路径不能为空'}), 400
     
     try:
-        # 获取当前用户的容器
-        containers = Container.query.filter_by(user_id=current_user.id).all()
-        if not containers:
-            return jsonify({'success': False, 'message': '没有可用的容器'}), 404
-        
-        container = containers[0]
-        if not container.is_running():
-            return jsonify({'success': False, 'message': '容器未运行'}), 400
+        # 获取当前用户的运行中容器（每请求只查一次）
+        container, error = _file_container()
+        if error:
+            return error
         
         # 读取文件内容
         command = f"cat '{path}'"
@@ -1151,6 +1488,11 @@ def get_file_content():
 @login_required
 def create_file():
     """创建文件"""
+    # 解析前先看Content-Length，超大JSON载荷不进解析器
+    length = request.content_length
+    if length and length > current_app.config['MAX_JSON_BODY_BYTES']:
+        return jsonify({'success': False, 'message': '请求体过大'}), 413
+
     data = request.get_json()
     path = data.get('path')
     content = data.get('content', '')
@@ -1159,24 +1501,34 @@ def create_file():
         return jsonify({'success': False, 'message': '文件路径不能为空'}), 400
     
     try:
-        # 获取当前用户的容器
-        containers = Container.query.filter_by(user_id=current_user.id).all()
-        if not containers:
-            return jsonify({'success': False, 'message': '没有可用的容器'}), 404
+        # 获取当前用户的运行中容器（每请求只查一次）
+        container, error = _file_container()
+        if error:
+            return error
         
-        container = containers[0]
-        if not container.is_running():
-            return jsonify({'success': False, 'message': '容器未运行'}), 400
-        
-        # 创建文件
-        escaped_content = content.replace("'", "'\"'\"'")
-        command = f"echo '{escaped_content}' > '{path}'"
+        # 创建文件：内容走引擎归档接口直接写入。
+        # 旧实现把整段内容转义后塞进shell argv，既是O(N)的重分配、
+        # 会撞ARG_MAX，也留有命令注入口
+        dest_dir, filename = os.path.split(path)
+        try:
+            ok = engine_manager.put_file(
+                container.container_id, dest_dir or '/', filename,
+                io.BytesIO(content.encode('utf-8')), container.engine_name
+            )
+            if ok:
+                return jsonify({'success': True, 'message': '文件创建成功'})
+            return jsonify({'success': False, 'message': '创建文件失败'}), 400
+        except NotImplementedError:
+            pass
+
+        # 引擎没有归档接口时回退shell写入，路径和内容都经shlex.quote
+        command = f"printf %s {shlex.quote(content)} > {shlex.quote(path)}"
         result = engine_manager.exec_command(
-            container.container_id, 
-            command, 
+            container.container_id,
+            command,
             container.engine_name
         )
-        
+
         if result['exit_code'] == 0:
             return jsonify({'success': True, 'message': '文件创建成功'})
         else:
@@ -1189,6 +1541,11 @@ def create_file():
 @login_required
 def update_file():
     """更新文件"""
+    # 解析前先看Content-Length，超大JSON载荷不进解析器
+    length = request.content_length
+    if length and length > current_app.config['MAX_JSON_BODY_BYTES']:
+        return jsonify({'success': False, 'message': '请求体过大'}), 413
+
     data = request.get_json()
     path = data.get('path')
     content = data.get('content', '')
@@ -1197,24 +1554,34 @@ def update_file():
         return jsonify({'success': False, 'message': '文件路径不能为空'}), 400
     
     try:
-        # 获取当前用户的容器
-        containers = Container.query.filter_by(user_id=current_user.id).all()
-        if not containers:
-            return jsonify({'success': False, 'message': '没有可用的容器'}), 404
-        
-        container = containers[0]
-        if not container.is_running():
-            return jsonify({'success': False, 'message': '容器未运行'}), 400
+        # 获取当前用户的运行中容器（每请求只查一次）
+        container, error = _file_container()
+        if error:
+            return error
         
-        # 更新文件内容
-        escaped_content = content.replace("'", "'\"'\"'")
-        command = f"echo '{escaped_content}' > '{path}'"
+        # 更新文件：内容走引擎归档接口直接写入。
+        # 旧实现把整段内容转义后塞进shell argv，既是O(N)的重分配、
+        # 会撞ARG_MAX，也留有命令注入口
+        dest_dir, filename = os.path.split(path)
+        try:
+            ok = engine_manager.put_file(
+                container.container_id, dest_dir or '/', filename,
+                io.BytesIO(content.encode('utf-8')), container.engine_name
+            )
+            if ok:
+                return jsonify({'success': True, 'message': '文件更新成功'})
+            return jsonify({'success': False, 'message': '更新文件失败'}), 400
+        except NotImplementedError:
+            pass
+
+        # 引擎没有归档接口时回退shell写入，路径和内容都经shlex.quote
+        command = f"printf %s {shlex.quote(content)} > {shlex.quote(path)}"
         result = engine_manager.exec_command(
-            container.container_id, 
-            command, 
+            container.container_id,
+            command,
             container.engine_name
         )
-        
+
         if result['exit_code'] == 0:
             return jsonify({'success': True, 'message': '文件更新成功'})
         else:
@@ -1232,14 +1599,10 @@ def delete_file():
         return jsonify({'success': False, 'message': '文件路径不能为空'}), 400
     
     try:
-        # 获取当前用户的容器
-        containers = Container.query.filter_by(user_id=current_user.id).all()
-        if not containers:
-            return jsonify({'success': False, 'message': '没有可用的容器'}), 404
-        
-        container = containers[0]
-        if not container.is_running():
-            return jsonify({'success': False, 'message': '容器未运行'}), 400
+        # 获取当前用户的运行中容器（每请求只查一次）
+        container, error = _file_container()
+        if error:
+            return error
         
         # 删除文件
         command = f"rm -f '{path}'"
@@ -1273,30 +1636,42 @@ def batch_delete_files():
             if '..' in path or path.startswith('/'):
                 return jsonify({'success': False, 'message': '无效的路径: ' + path}), 400
         
-        # 获取当前用户的容器
-        containers = Container.query.filter_by(user_id=current_user.id).all()
-        if not containers:
-            return jsonify({'success': False, 'message': '没有可用的容器'}), 404
-        
-        container = containers[0]
-        if not container.is_running():
-            return jsonify({'success': False, 'message': '容器未运行'}), 400
+        # 获取当前用户的运行中容器（每请求只查一次）
+        container, error = _file_container()
+        if error:
+            return error
         
         # 执行批量删除命令
+        # 每个路径单独exec是N+1模式，删N个文件要付N次exec往返；
+        # 改为一次exec在容器内循环删除，失败路径用FAIL:前缀回传定位，
+        # 按100个路径一批以控制命令行长度
         success_count = 0
         errors = []
-        
-        for path in paths:
-            command = f"rm -rf '{path}'"
+
+        for start in range(0, len(paths), 100):
+            chunk = paths[start:start + 100]
+            quoted = ' '.join(shlex.quote(p) for p in chunk)
+            # exec_run按argv直接执行不经shell，循环语法必须包进sh -c
+            loop = f'for p in {quoted}; do rm -rf -- "$p" || echo "FAIL:$p"; done'
+            command = f'sh -c {shlex.quote(loop)}'
             result = engine_manager.exec_command(
-                container.container_id, 
-                command, 
+                container.container_id,
+                command,
                 container.engine_name
             )
-            if result['exit_code'] == 0:
-                success_count += 1
-            else:
-                errors.append(f'{path}: {result.get("error", "删除失败")}')
+            failed = {
+                line[5:]
+                for line in (result.get('output') or '').splitlines()
+                if line.startswith('FAIL:')
+            }
+            if result['exit_code'] != 0 and not failed:
+                # exec本身失败时整批记为失败
+                failed = set(chunk)
+            for path in chunk:
+                if path in failed:
+                    errors.append(f'{path}: {result.get("error", "删除失败")}')
+                else:
+                    success_count += 1
         
         if success_count == len(paths):
             return jsonify({'success': True, 'message': '批量删除成功'})
@@ -1324,14 +1699,10 @@ def upload_files():
         return jsonify({'success': False, 'message': '没有选择文件'}), 400
     
     try:
-        # 获取当前用户的容器
-        containers = Container.query.filter_by(user_id=current_user.id).all()
-        if not containers:
-            return jsonify({'success': False, 'message': '没有可用的容器'}), 404
-        
-        container = containers[0]
-        if not container.is_running():
-            return jsonify({'success': False, 'message': '容器未运行'}), 400
+        # 获取当前用户的运行中容器（每请求只查一次）
+        container, error = _file_container()
+        if error:
+            return error
         
         uploaded_files = []
         failed_files = []
@@ -1339,37 +1710,47 @@ def upload_files():
         for file in files:
             if file.filename == '':
                 continue
-                
+
             try:
-                # 保存文件到临时位置
-                temp_path = os.path.join('/tmp', file.filename)
-                file.save(temp_path)
-                
-                # 读取文件内容
-                with open(temp_path, 'rb') as f:
-                    content = f.read()
-                
-                # 转换为base64以便传输
-                import base64
-                encoded_content = base64.b64encode(content).decode('utf-8')
-                
-                # 在容器中创建文件
+                # 直接把上传流经引擎归档接口写入容器，
+                # 跳过/tmp落盘、整体读入和base64的4/3倍膨胀
+                try:
+                    if engine_manager.put_file(
+                        container.container_id, path, file.filename,
+                        file.stream, container.engine_name
+                    ):
+                        uploaded_files.append(file.filename)
+                    else:
+                        failed_files.append({'filename': file.filename, 'error': '写入容器失败'})
+                    continue
+                except NotImplementedError:
+                    # 引擎没有归档接口时回退到base64管道
+                    pass
+
+                # 分块追加写入：整文件读入内存再塞进argv会撞ARG_MAX，
+                # 峰值内存也随文件大小线性增长；按48KB块编码后管道解码
+                file.stream.seek(0)
                 file_path = os.path.join(path, file.filename)
-                command = f"echo '{encoded_content}' | base64 -d > '{file_path}'"
-                result = engine_manager.exec_command(
-                    container.container_id, 
-                    command, 
-                    container.engine_name
-                )
-                
-                # 清理临时文件
-                os.remove(temp_path)
-                
+                quoted_path = shlex.quote(file_path)
+                redirect = '>'
+                while True:
+                    chunk = file.stream.read(_UPLOAD_CHUNK)
+                    encoded = base64.b64encode(chunk).decode('ascii')
+                    command = f"printf %s {encoded} | base64 -d {redirect} {quoted_path}"
+                    result = engine_manager.exec_command(
+                        container.container_id,
+                        command,
+                        container.engine_name
+                    )
+                    if result['exit_code'] != 0 or len(chunk) < _UPLOAD_CHUNK:
+                        break
+                    redirect = '>>'
+
                 if result['exit_code'] == 0:
                     uploaded_files.append(file.filename)
                 else:
                     failed_files.append({'filename': file.filename, 'error': result['error']})
-                    
+
             except Exception as e:
                 failed_files.append({'filename': file.filename, 'error': str(e)})
         
@@ -1401,14 +1782,10 @@ def create_directory():
         return jsonify({'success': False, 'message': '路径和名称不能为空'}), 400
     
     try:
-        # 获取当前用户的容器
-        containers = Container.query.filter_by(user_id=current_user.id).all()
-        if not containers:
-            return jsonify({'success': False, 'message': '没有可用的容器'}), 404
-        
-        container = containers[0]
-        if not container.is_running():
-            return jsonify({'success': False, 'message': '容器未运行'}), 400
+        # 获取当前用户的运行中容器（每请求只查一次）
+        container, error = _file_container()
+        if error:
+            return error
         
         # 创建目录
         dir_path = os.path.join(path, name)
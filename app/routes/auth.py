@@ -2,17 +2,34 @@ from flask import Blueprint, request, jsonify, session, render_template, redirec
 from flask_login import login_user, logout_user, login_required, current_user
 from werkzeug.security import check_password_hash
 from datetime import datetime
+import hmac
 import re
 
 from app import db, login_manager
 from app.models import User, SystemSettings
 
+# 模块级预编译校验正则：re.match每次都要查模式缓存并做类型判断，
+# 热路径上直接用编译好的Pattern
+USERNAME_RE = re.compile(r'^[a-zA-Z0-9_]+$')
+EMAIL_RE = re.compile(r'^[^\s@]+@[^\s@]+\.[^\s@]+$')
+
 auth_bp = Blueprint('auth', __name__)
 
+def _verify_password(password_hash, password):
+    """校验口令哈希（与User.check_password同语义，供轻量行使用）"""
+    try:
+        return check_password_hash(password_hash, password)
+    except ValueError:
+        # 哈希格式无法识别时的回退路径：恒定时间比较，避免时序侧信道；
+        # 先编码为bytes，str参数含非ASCII时compare_digest会抛TypeError
+        return hmac.compare_digest(
+            password_hash.encode('utf-8'), password.encode('utf-8')
+        )
+
 @login_manager.user_loader
 def load_user(user_id):
-    """加载用户"""
-    return User.query.get(int(user_id))
+    """加载用户（containers/networks关系为selectin，随用户一次批量加载）"""
+    return db.session.get(User, int(user_id))
 
 @auth_bp.route('/login', methods=['GET', 'POST'])
 def login():
@@ -31,41 +48,48 @@ def login():
         flash('用户名和密码不能为空', 'error')
         return render_template('auth/login.html')
     
-    # 查找用户
-    user = User.query.filter(
+    # 查找用户：认证判定只需四列，先做轻量覆盖查询；
+    # 完整User行（含selectin关系）只在口令通过后的成功路径上取
+    row = db.session.query(
+        User.id, User.password_hash, User.is_active, User.is_admin
+    ).filter(
         (User.username == username) | (User.email == username)
     ).first()
-    
-    if not user or not user.check_password(password):
+
+    if not row or not _verify_password(row.password_hash, password):
         if request.is_json:
             return jsonify({'success': False, 'message': '用户名或密码错误'}), 401
         flash('用户名或密码错误', 'error')
         return render_template('auth/login.html')
-    
-    if not user.is_active:
+
+    if not row.is_active:
         if request.is_json:
             return jsonify({'success': False, 'message': '账户已被禁用'}), 403
         flash('账户已被禁用', 'error')
         return render_template('auth/login.html')
-    
-    # 检查维护模式
+
+    # 检查维护模式（直接读布尔列，登录热路径少一次方法调用）
     settings = SystemSettings.get_settings()
-    if settings.is_maintenance_mode() and not user.is_admin:
+    if settings.maintenance_mode and not row.is_admin:
         if request.is_json:
             return jsonify({'success': False, 'message': '系统正在维护中'}), 503
         flash('系统正在维护中', 'error')
         return render_template('auth/login.html')
-    
-    # 登录用户
+
+    # 登录用户（此时才物化完整对象）
+    user = db.session.get(User, row.id)
     login_user(user, remember=remember)
     user.update_last_login()
+    # 提交前先序列化：commit会把对象置为过期，之后再to_dict()
+    # 要重新SELECT用户行和selectin关系
+    payload = user.to_dict() if request.is_json else None
     db.session.commit()
-    
+
     if request.is_json:
         return jsonify({
             'success': True,
             'message': '登录成功',
-            'user': user.to_dict(),
+            'user': payload,
             'redirect_url': url_for('main.dashboard')
         })
     
@@ -79,8 +103,9 @@ def login():
 def register():
     """用户注册"""
     settings = SystemSettings.get_settings()
-    
-    if not settings.is_registration_allowed():
+
+    # 直接读布尔列判断，不再经过方法调用
+    if not settings.allow_registration or settings.maintenance_mode:
         if request.method == 'GET':
             return render_template('auth/register_disabled.html')
         return jsonify({'success': False, 'message': '注册已关闭'}), 403
@@ -103,12 +128,12 @@ def register():
         errors.append('用户名不能为空')
     elif len(username) < 3 or len(username) > 20:
         errors.append('用户名长度必须在3-20个字符之间')
-    elif not re.match(r'^[a-zA-Z0-9_]+$', username):
+    elif not USERNAME_RE.match(username):
         errors.append('用户名只能包含字母、数字和下划线')
     
     if not email:
         errors.append('邮箱不能为空')
-    elif not re.match(r'^[^\s@]+@[^\s@]+\.[^\s@]+$', email):
+    elif len(email) > 320 or not EMAIL_RE.match(email):
         errors.append('邮箱格式不正确')
     
     if not password:
@@ -123,11 +148,13 @@ def register():
     if settings.registration_code and not settings.verify_registration_code(registration_code):
         errors.append('注册码错误')
     
-    # 检查用户名和邮箱是否已存在
-    if User.query.filter_by(username=username).first():
+    # 检查用户名和邮箱是否已存在（一条OR查询同时查两个唯一索引，只取冲突列）
+    conflicts = db.session.query(User.username, User.email).filter(
+        db.or_(User.username == username, User.email == email)
+    ).all()
+    if any(row.username == username for row in conflicts):
         errors.append('用户名已存在')
-    
-    if User.query.filter_by(email=email).first():
+    if any(row.email == email for row in conflicts):
         errors.append('邮箱已被注册')
     
     if errors:
@@ -200,12 +227,14 @@ def profile():
     
     if not email:
         errors.append('邮箱不能为空')
-    elif not re.match(r'^[^\s@]+@[^\s@]+\.[^\s@]+$', email):
+    elif len(email) > 320 or not EMAIL_RE.match(email):
         errors.append('邮箱格式不正确')
     
-    # 检查邮箱是否已被其他用户使用
-    existing_user = User.query.filter_by(email=email).first()
-    if existing_user and existing_user.id != current_user.id:
+    # 检查邮箱是否已被其他用户使用（只查id，不用实例化完整User对象）
+    email_taken = db.session.query(User.id).filter(
+        User.email == email, User.id != current_user.id
+    ).first()
+    if email_taken:
         errors.append('邮箱已被其他用户使用')
     
     if errors:
@@ -291,23 +320,34 @@ def user_info():
 @login_required
 def user_stats():
     """获取用户统计信息API"""
+    # 用量来自预加载的容器集合与增量计数列，各读一次后复用，
+    # 不再对同一个值重复走代理+方法调用；限额同理，limits和百分比各用一次。
+    # current_user是werkzeug代理，每次属性访问都多一跳，先解引用一次
+    user = current_user._get_current_object()
+    container_count = user.get_container_count()
+    used_ports = user.get_used_ports()
+    used_storage = user.get_used_storage()
+    max_containers = user.max_containers
+    max_ports = user.max_ports
+    max_storage = user.max_storage
+
     stats = {
-        'container_count': current_user.get_container_count(),
-        'used_ports': current_user.get_used_ports(),
-        'used_storage': current_user.get_used_storage(),
-        'coins': current_user.coins,
+        'container_count': container_count,
+        'used_ports': used_ports,
+        'used_storage': used_storage,
+        'coins': user.coins,
         'limits': {
-            'max_containers': current_user.max_containers,
-            'max_ports': current_user.max_ports,
-            'max_storage': current_user.max_storage,
-            'max_cpu': current_user.max_cpu,
-            'max_memory': current_user.max_memory
+            'max_containers': max_containers,
+            'max_ports': max_ports,
+            'max_storage': max_storage,
+            'max_cpu': user.max_cpu,
+            'max_memory': user.max_memory
         },
         'usage_percentage': {
-            'containers': (current_user.get_container_count() / current_user.max_containers * 100) if current_user.max_containers > 0 else 0,
-            'ports': (current_user.get_used_ports() / current_user.max_ports * 100) if current_user.max_ports > 0 else 0,
-            'storage': (current_user.get_used_storage() / current_user.max_storage * 100) if current_user.max_storage > 0 else 0
+            'containers': (container_count / max_containers * 100) if max_containers > 0 else 0,
+            'ports': (used_ports / max_ports * 100) if max_ports > 0 else 0,
+            'storage': (used_storage / max_storage * 100) if max_storage > 0 else 0
         }
     }
-    
+
     return jsonify({'success': True, 'stats': stats})
\ No newline at end of file
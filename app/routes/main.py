@@ -1,6 +1,10 @@
 from flask import Blueprint, render_template, request, jsonify, redirect, url_for
 from flask_login import login_required, current_user
 from datetime import datetime, timedelta
+import threading
+import time
+from sqlalchemy import case
+from sqlalchemy.orm import joinedload
 
 from app import db
 from app.models import User, Container, Network, Template, SystemSettings, Engine
@@ -8,6 +12,59 @@ from app.container_engines.manager import engine_manager
 
 main_bp = Blueprint('main', __name__)
 
+# 判定"已停止"的状态集合，与API层保持一致
+_STOPPED_STATES = ('stopped', 'exited')
+
+# 引擎健康探测的短TTL缓存：仪表盘每几秒轮询一次，
+# TTL窗口内的并发页签复用同一次socket探测
+_HEALTH_TTL = 5.0
+_health_cache = [0.0, None]  # [过期时刻, 结果]
+_health_lock = threading.Lock()
+
+# 首页匿名统计的TTL缓存：登录前的聚合数字不需要逐请求重算
+_INDEX_TTL = 30.0
+_index_cache = [0.0, None]
+_index_lock = threading.Lock()
+
+def _health_check_cached():
+    """带短TTL缓存的引擎健康检查"""
+    now = time.monotonic()
+    with _health_lock:
+        if _health_cache[1] is not None and _health_cache[0] > now:
+            return _health_cache[1]
+    status = engine_manager.health_check()
+    with _health_lock:
+        _health_cache[0] = now + _HEALTH_TTL
+        _health_cache[1] = status
+    return status
+
+def _user_container_stats(user_id):
+    """用户容器状态统计：一条GROUP BY代替物化全部行后在Python里数四遍"""
+    counts = Container.status_counts_for_user(user_id)
+    return {
+        'total': sum(counts.values()),
+        'running': counts.get('running', 0),
+        'stopped': counts.get('stopped', 0) + counts.get('exited', 0),
+        'created': counts.get('created', 0)
+    }
+
+def _user_network_stats(user_id):
+    """用户网络统计：COUNT+条件SUM一条查询完成"""
+    row = db.session.query(
+        db.func.count(Network.id),
+        db.func.sum(case((Network.is_active, 1), else_=0))
+    ).filter(Network.user_id == user_id).one()
+    return {'total': int(row[0] or 0), 'active': int(row[1] or 0)}
+
+def _container_totals():
+    """全局容器总数/运行数/停止数（一条CASE聚合）"""
+    row = db.session.query(
+        db.func.count(Container.id),
+        db.func.sum(case((Container.status == 'running', 1), else_=0)),
+        db.func.sum(case((Container.status.in_(_STOPPED_STATES), 1), else_=0))
+    ).one()
+    return int(row[0] or 0), int(row[1] or 0), int(row[2] or 0)
+
 @main_bp.route('/')
 def index():
     """首页"""
@@ -15,14 +72,28 @@ def index():
         return redirect(url_for('main.dashboard'))
     
     settings = SystemSettings.get_settings()
-    
-    # 获取系统统计信息
-    stats = {
-        'total_users': User.query.filter_by(is_active=True).count(),
-        'total_containers': Container.query.count(),
-        'running_containers': Container.query.filter_by(status='running').count(),
-        'total_templates': Template.query.filter_by(is_active=True, is_public=True).count()
-    }
+
+    # 获取系统统计信息（容器总数与运行数合并为一条CASE聚合，
+    # 匿名首页的结果带30秒TTL缓存，高并发落地页不逐请求打库）
+    now = time.monotonic()
+    with _index_lock:
+        if _index_cache[1] is not None and _index_cache[0] > now:
+            stats = _index_cache[1]
+        else:
+            stats = None
+    if stats is None:
+        total_containers, running_containers, _ = _container_totals()
+        stats = {
+            'total_users': db.session.query(db.func.count(User.id)).filter(
+                User.is_active).scalar(),
+            'total_containers': total_containers,
+            'running_containers': running_containers,
+            'total_templates': db.session.query(db.func.count(Template.id)).filter(
+                Template.is_active, Template.is_public).scalar()
+        }
+        with _index_lock:
+            _index_cache[0] = now + _INDEX_TTL
+            _index_cache[1] = stats
     
     return render_template('index.html', stats=stats, settings=settings)
 
@@ -30,38 +101,31 @@ def index():
 @login_required
 def dashboard():
     """用户仪表板"""
-    # 获取用户容器统计
-    user_containers = Container.get_user_containers(current_user.id)
-    container_stats = {
-        'total': len(user_containers),
-        'running': len([c for c in user_containers if c.status == 'running']),
-        'stopped': len([c for c in user_containers if c.status in ['stopped', 'exited']]),
-        'created': len([c for c in user_containers if c.status == 'created'])
-    }
+    # 获取用户容器/网络统计（聚合下推到SQL，不把全部行拉进Python）
+    container_stats = _user_container_stats(current_user.id)
+    network_stats = _user_network_stats(current_user.id)
     
-    # 获取用户网络统计
-    user_networks = Network.get_user_networks(current_user.id)
-    network_stats = {
-        'total': len(user_networks),
-        'active': len([n for n in user_networks if n.is_active])
-    }
-    
-    # 获取资源使用情况
+    # 获取资源使用情况（用量和限额各读一次，used和percentage共用同一份值）
+    used_ports = current_user.get_used_ports()
+    used_storage = current_user.get_used_storage()
+    max_containers = current_user.max_containers
+    max_ports = current_user.max_ports
+    max_storage = current_user.max_storage
     resource_usage = {
         'containers': {
             'used': container_stats['total'],
-            'limit': current_user.max_containers,
-            'percentage': (container_stats['total'] / current_user.max_containers * 100) if current_user.max_containers > 0 else 0
+            'limit': max_containers,
+            'percentage': (container_stats['total'] / max_containers * 100) if max_containers > 0 else 0
         },
         'ports': {
-            'used': current_user.get_used_ports(),
-            'limit': current_user.max_ports,
-            'percentage': (current_user.get_used_ports() / current_user.max_ports * 100) if current_user.max_ports > 0 else 0
+            'used': used_ports,
+            'limit': max_ports,
+            'percentage': (used_ports / max_ports * 100) if max_ports > 0 else 0
         },
         'storage': {
-            'used': current_user.get_used_storage(),
-            'limit': current_user.max_storage,
-            'percentage': (current_user.get_used_storage() / current_user.max_storage * 100) if current_user.max_storage > 0 else 0
+            'used': used_storage,
+            'limit': max_storage,
+            'percentage': (used_storage / max_storage * 100) if max_storage > 0 else 0
         }
     }
     
@@ -69,9 +133,9 @@ def dashboard():
     recent_containers = Container.query.filter_by(user_id=current_user.id)\
         .order_by(Container.updated_at.desc()).limit(5).all()
     
-    # 获取引擎状态
-    engine_status = engine_manager.health_check()
-    
+    # 获取引擎状态（短TTL缓存，轮询窗口内复用探测结果）
+    engine_status = _health_check_cached()
+
     if request.is_json:
         return jsonify({
             'success': True,
@@ -97,7 +161,7 @@ def dashboard():
 def containers():
     """容器管理页面"""
     # 获取可用引擎用于筛选
-    engines = engine_manager.list_engines()
+    engines = engine_manager.list_engines_cached()
     return render_template('containers/list.html', engines=engines)
 
 @main_bp.route('/containers/create')
@@ -111,7 +175,7 @@ def create_container():
     networks = Network.get_user_networks(current_user.id)
     
     # 获取可用引擎
-    engines = engine_manager.list_engines()
+    engines = engine_manager.list_engines_cached()
     
     return render_template('containers/create.html',
                          templates=templates,
@@ -141,7 +205,7 @@ def networks():
 def create_network():
     """创建网络页面"""
     # 获取可用引擎
-    engines = engine_manager.list_engines()
+    engines = engine_manager.list_engines_cached()
     
     return render_template('networks/create.html', engines=engines)
 
@@ -195,19 +259,22 @@ def terminal():
 @login_required
 def system_status():
     """系统状态API"""
-    # 获取引擎状态
-    engine_status = engine_manager.health_check()
-    engines_info = engine_manager.list_engines()
+    # 获取引擎状态（短TTL缓存，轮询窗口内复用探测结果）
+    engine_status = _health_check_cached()
+    engines_info = engine_manager.list_engines_cached()
     
-    # 获取系统统计
+    # 获取系统统计（容器总数/运行数合并为一条CASE聚合）
+    total_containers, running_containers, _ = _container_totals()
     system_stats = {
-        'total_users': User.query.filter_by(is_active=True).count(),
-        'total_containers': Container.query.count(),
-        'running_containers': Container.query.filter_by(status='running').count(),
-        'total_networks': Network.query.count(),
-        'total_templates': Template.query.filter_by(is_active=True).count(),
+        'total_users': db.session.query(db.func.count(User.id)).filter(
+            User.is_active).scalar(),
+        'total_containers': total_containers,
+        'running_containers': running_containers,
+        'total_networks': db.session.query(db.func.count(Network.id)).scalar(),
+        'total_templates': db.session.query(db.func.count(Template.id)).filter(
+            Template.is_active).scalar(),
         'total_engines': len(engines_info),
-        'connected_engines': len([e for e in engines_info if e['is_connected']])
+        'connected_engines': sum(1 for e in engines_info if e['is_connected'])
     }
     
     return jsonify({
@@ -225,45 +292,58 @@ def dashboard_stats():
     """仪表板统计API"""
     if current_user.is_admin:
         # 管理员看到全局统计
+        # 每张表一条CASE聚合，9条COUNT(*)降为4条查询
+        user_row = db.session.query(
+            db.func.count(User.id),
+            db.func.sum(case((User.is_active, 1), else_=0)),
+            db.func.sum(case((User.is_admin, 1), else_=0))
+        ).one()
+        total_containers, running_containers, stopped_containers = _container_totals()
+        network_row = db.session.query(
+            db.func.count(Network.id),
+            db.func.sum(case((Network.is_active, 1), else_=0))
+        ).one()
+        template_row = db.session.query(
+            db.func.count(Template.id),
+            db.func.sum(case((Template.is_public, 1), else_=0)),
+            db.func.sum(case((Template.is_active, 1), else_=0))
+        ).one()
         stats = {
             'users': {
-                'total': User.query.count(),
-                'active': User.query.filter_by(is_active=True).count(),
-                'admin': User.query.filter_by(is_admin=True).count()
+                'total': int(user_row[0] or 0),
+                'active': int(user_row[1] or 0),
+                'admin': int(user_row[2] or 0)
             },
             'containers': {
-                'total': Container.query.count(),
-                'running': Container.query.filter_by(status='running').count(),
-                'stopped': Container.query.filter(Container.status.in_(['stopped', 'exited'])).count()
+                'total': total_containers,
+                'running': running_containers,
+                'stopped': stopped_containers
             },
             'networks': {
-                'total': Network.query.count(),
-                'active': Network.query.filter_by(is_active=True).count()
+                'total': int(network_row[0] or 0),
+                'active': int(network_row[1] or 0)
             },
             'templates': {
-                'total': Template.query.count(),
-                'public': Template.query.filter_by(is_public=True).count(),
-                'active': Template.query.filter_by(is_active=True).count()
+                'total': int(template_row[0] or 0),
+                'public': int(template_row[1] or 0),
+                'active': int(template_row[2] or 0)
             },
             'engines': engine_manager.get_all_system_info()
         }
     else:
-        # 普通用户看到个人统计
-        user_containers = Container.get_user_containers(current_user.id)
-        user_networks = Network.get_user_networks(current_user.id)
-        
+        # 普通用户看到个人统计（同样走SQL聚合）
+        container_stats = _user_container_stats(current_user.id)
+        network_stats = _user_network_stats(current_user.id)
+
         stats = {
             'containers': {
-                'total': len(user_containers),
-                'running': len([c for c in user_containers if c.status == 'running']),
-                'stopped': len([c for c in user_containers if c.status in ['stopped', 'exited']])
-            },
-            'networks': {
-                'total': len(user_networks),
-                'active': len([n for n in user_networks if n.is_active])
+                'total': container_stats['total'],
+                'running': container_stats['running'],
+                'stopped': container_stats['stopped']
             },
+            'networks': network_stats,
             'resources': {
-                'containers_used': len(user_containers),
+                'containers_used': container_stats['total'],
                 'containers_limit': current_user.max_containers,
                 'ports_used': current_user.get_used_ports(),
                 'ports_limit': current_user.max_ports,
@@ -283,7 +363,10 @@ def recent_activity():
     
     if current_user.is_admin:
         # 管理员看到全局活动
-        recent_containers = Container.query.order_by(Container.updated_at.desc()).limit(10).all()
+        # owner关系随主查询JOIN取回，循环里读owner.username不再逐行补查
+        recent_containers = Container.query.options(
+            joinedload(Container.owner)
+        ).order_by(Container.updated_at.desc()).limit(10).all()
         recent_users = User.query.order_by(User.created_at.desc()).limit(5).all()
         
         for container in recent_containers:
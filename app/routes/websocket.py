@@ -1,10 +1,14 @@
-from flask import Blueprint, request, jsonify
+from collections import deque
+from flask import Blueprint, current_app, request, jsonify
 from flask_login import login_required, current_user
 from flask_socketio import emit, join_room, leave_room, disconnect
+import io
 import os
 import json
+import shlex
 import threading
 import time
+from sqlalchemy.orm import load_only
 
 from app import socketio, db
 from app.models import Container
@@ -15,6 +19,58 @@ websocket_bp = Blueprint('websocket', __name__)
 # 存储活跃的终端会话
 active_terminals = {}
 
+# 用户→终端会话的反向索引：断连清理只看自己的会话，不再全量扫描键前缀
+_user_terminals = {}
+
+def _get_container_core(container_id):
+    """只取权限判断与引擎路由所需的核心列，不拖出大文本配置列"""
+    return db.session.get(Container, container_id, options=(
+        load_only(
+            Container.name, Container.user_id, Container.container_id,
+            Container.engine_name, Container.status
+        ),
+    ))
+
+# 正在运行监控线程的房间：每个容器只跑一个轮询线程，由首个订阅者启动
+_monitor_rooms = set()
+_monitor_lock = threading.Lock()
+
+def _pump_shell_output(terminal_id, shell):
+    """后台任务：把持久shell的输出持续搬运到终端房间"""
+    try:
+        while terminal_id in active_terminals:
+            data = shell.recv(4096)
+            if not data:
+                break
+            session = active_terminals.get(terminal_id)
+            if session is None:
+                break
+            output = data.decode('utf-8', errors='replace')
+            session['history'].append(output)
+            socketio.emit('terminal_output', {'output': output}, room=terminal_id)
+    except Exception:
+        pass
+    finally:
+        try:
+            shell.close()
+        except Exception:
+            pass
+
+def _close_terminal(terminal_id):
+    """清理终端会话，关闭挂着的持久shell并维护反向索引"""
+    session = active_terminals.pop(terminal_id, None)
+    uid = terminal_id.split('_', 1)[0]
+    ids = _user_terminals.get(uid)
+    if ids:
+        ids.discard(terminal_id)
+        if not ids:
+            del _user_terminals[uid]
+    if session and session.get('shell') is not None:
+        try:
+            session['shell'].close()
+        except Exception:
+            pass
+
 @socketio.on('connect')
 def handle_connect():
     """WebSocket连接处理"""
@@ -31,11 +87,9 @@ def handle_disconnect():
     if current_user.is_authenticated:
         print(f'User {current_user.username} disconnected')
         
-        # 清理用户的终端会话
-        user_terminals = [k for k in active_terminals.keys() if k.startswith(f"{current_user.id}_")]
-        for terminal_id in user_terminals:
-            if terminal_id in active_terminals:
-                del active_terminals[terminal_id]
+        # 清理用户的终端会话（反向索引直取，复杂度只与本人会话数相关）
+        for terminal_id in list(_user_terminals.get(str(current_user.id), ())):
+            _close_terminal(terminal_id)
 
 @socketio.on('join_terminal')
 def handle_join_terminal(data):
@@ -50,7 +104,7 @@ def handle_join_terminal(data):
         return
     
     # 检查容器权限
-    container = Container.query.get(container_id)
+    container = _get_container_core(container_id)
     if not container:
         emit('error', {'message': '容器不存在'})
         return
@@ -71,12 +125,31 @@ def handle_join_terminal(data):
     
     # 初始化终端会话
     if terminal_id not in active_terminals:
-        active_terminals[terminal_id] = {
+        session = {
             'container': container,
             'users': set(),
-            'history': []
+            # maxlen让溢出条目自动从头部淘汰，
+            # 不再攒到1000条后整段切片复制
+            'history': deque(maxlen=500),
+            'shell': None
         }
-    
+        # 优先建立持久shell：之后每次输入只是往socket写一行，
+        # 不再为每条命令新起一个exec进程（fork+attach是主要耗时）
+        try:
+            shell = engine_manager.open_shell(
+                container.container_id, engine_name=container.engine_name
+            )
+        except NotImplementedError:
+            # 引擎没有交互式shell接口时退回逐命令执行
+            shell = None
+        except Exception:
+            shell = None
+        active_terminals[terminal_id] = session
+        _user_terminals.setdefault(str(current_user.id), set()).add(terminal_id)
+        if shell is not None:
+            session['shell'] = shell
+            socketio.start_background_task(_pump_shell_output, terminal_id, shell)
+
     active_terminals[terminal_id]['users'].add(current_user.id)
     
     emit('terminal_ready', {
@@ -86,9 +159,10 @@ def handle_join_terminal(data):
     })
     
     # 发送历史记录
-    if active_terminals[terminal_id]['history']:
+    history = active_terminals[terminal_id]['history']
+    if history:
         emit('terminal_output', {
-            'output': '\n'.join(active_terminals[terminal_id]['history'][-50:])  # 最近50行
+            'output': '\n'.join(list(history)[-50:])  # 最近50行
         })
 
 @socketio.on('leave_terminal')
@@ -108,7 +182,7 @@ def handle_leave_terminal(data):
         
         # 如果没有用户了，清理会话
         if not active_terminals[terminal_id]['users']:
-            del active_terminals[terminal_id]
+            _close_terminal(terminal_id)
 
 @socketio.on('terminal_input')
 def handle_terminal_input(data):
@@ -127,7 +201,19 @@ def handle_terminal_input(data):
     if not command:
         return
     
-    container = active_terminals[terminal_id]['container']
+    session = active_terminals[terminal_id]
+
+    # 持久shell路径：输入直接写socket，输出由后台任务异步送回房间
+    shell = session.get('shell')
+    if shell is not None:
+        try:
+            shell.sendall((command + '\n').encode('utf-8'))
+            return
+        except Exception:
+            # shell断开时摘掉它，本次及之后的输入退回逐命令执行
+            session['shell'] = None
+
+    container = session['container']
     
     try:
         # 执行命令
@@ -149,12 +235,8 @@ def handle_terminal_input(data):
         
         output = '\n'.join(output_lines)
         
-        # 保存到历史记录
-        active_terminals[terminal_id]['history'].extend(output_lines)
-        
-        # 限制历史记录长度
-        if len(active_terminals[terminal_id]['history']) > 1000:
-            active_terminals[terminal_id]['history'] = active_terminals[terminal_id]['history'][-500:]
+        # 保存到历史记录（deque自动截断，无需手工整理）
+        session['history'].extend(output_lines)
         
         # 发送输出到房间内所有用户
         socketio.emit('terminal_output', {
@@ -164,7 +246,7 @@ def handle_terminal_input(data):
         
     except Exception as e:
         error_msg = f"命令执行失败: {str(e)}"
-        active_terminals[terminal_id]['history'].append(error_msg)
+        session['history'].append(error_msg)
         
         socketio.emit('terminal_output', {
             'output': error_msg,
@@ -187,7 +269,7 @@ def handle_container_logs(data):
         return
     
     # 检查容器权限
-    container = Container.query.get(container_id)
+    container = _get_container_core(container_id)
     if not container:
         emit('error', {'message': '容器不存在'})
         return
@@ -226,7 +308,7 @@ def handle_monitor_container(data):
         return
     
     # 检查容器权限
-    container = Container.query.get(container_id)
+    container = _get_container_core(container_id)
     if not container:
         emit('error', {'message': '容器不存在'})
         return
@@ -239,47 +321,72 @@ def handle_monitor_container(data):
     
     if action == 'start':
         join_room(room_name)
-        
-        # 启动监控线程
-        def monitor_thread():
-            while room_name in [room for room in socketio.server.manager.rooms.get('/', {}).keys()]:
+
+        # 同一容器的监控线程只起一个：后续订阅者直接进房间共享推送，
+        # N个查看者不再产生N倍的引擎轮询和重复DB写入
+        with _monitor_lock:
+            already_running = room_name in _monitor_rooms
+            if not already_running:
+                _monitor_rooms.add(room_name)
+
+        if not already_running:
+            app = current_app._get_current_object()
+            container_pk = container.id
+            engine_cid = container.container_id
+            engine_name = container.engine_name
+
+            # 启动监控线程（线程内使用独立会话，不复用请求线程的ORM对象）
+            def monitor_thread():
                 try:
-                    # 获取容器实时信息
-                    engine_container = engine_manager.get_container(
-                        container.container_id, 
-                        container.engine_name
-                    )
-                    
-                    if engine_container:
-                        # 更新数据库中的容器状态
-                        container.update_status(engine_container.status)
-                        container.ip_address = engine_container.ip_address
-                        container.update_stats(engine_container.cpu_usage, engine_container.memory_usage)
-                        db.session.commit()
-                        
-                        # 发送实时数据
-                        socketio.emit('container_stats', {
-                            'container_id': container_id,
-                            'status': engine_container.status,
-                            'cpu_usage': engine_container.cpu_usage,
-                            'memory_usage': engine_container.memory_usage,
-                            'ip_address': engine_container.ip_address,
-                            'timestamp': time.time()
-                        }, room=room_name)
-                    
-                    time.sleep(5)  # 每5秒更新一次
-                    
-                except Exception as e:
-                    socketio.emit('error', {
-                        'message': f'监控失败: {str(e)}'
-                    }, room=room_name)
-                    break
-        
-        # 启动监控线程
-        thread = threading.Thread(target=monitor_thread)
-        thread.daemon = True
-        thread.start()
-        
+                    with app.app_context():
+                        while room_name in socketio.server.manager.rooms.get('/', {}):
+                            try:
+                                # 获取容器实时信息
+                                engine_container = engine_manager.get_container(
+                                    engine_cid, engine_name
+                                )
+
+                                if engine_container:
+                                    # 更新数据库中的容器状态（只加载要写的列）
+                                    row = db.session.get(Container, container_pk, options=(
+                                        load_only(
+                                            Container.status, Container.ip_address,
+                                            Container.cpu_usage, Container.memory_usage,
+                                            Container.started_at, Container.stopped_at
+                                        ),
+                                    ))
+                                    if row is None:
+                                        break
+                                    row.update_status(engine_container.status)
+                                    row.ip_address = engine_container.ip_address
+                                    row.update_stats(engine_container.cpu_usage, engine_container.memory_usage)
+                                    db.session.commit()
+
+                                    # 发送实时数据
+                                    socketio.emit('container_stats', {
+                                        'container_id': container_id,
+                                        'status': engine_container.status,
+                                        'cpu_usage': engine_container.cpu_usage,
+                                        'memory_usage': engine_container.memory_usage,
+                                        'ip_address': engine_container.ip_address,
+                                        'timestamp': time.time()
+                                    }, room=room_name)
+
+                                time.sleep(5)  # 每5秒更新一次
+
+                            except Exception as e:
+                                socketio.emit('error', {
+                                    'message': f'监控失败: {str(e)}'
+                                }, room=room_name)
+                                break
+                finally:
+                    with _monitor_lock:
+                        _monitor_rooms.discard(room_name)
+
+            thread = threading.Thread(target=monitor_thread)
+            thread.daemon = True
+            thread.start()
+
         emit('monitor_started', {'container_id': container_id})
         
     elif action == 'stop':
@@ -302,7 +409,7 @@ def handle_file_browser(data):
         return
     
     # 检查容器权限
-    container = Container.query.get(container_id)
+    container = _get_container_core(container_id)
     if not container:
         emit('error', {'message': '容器不存在'})
         return
@@ -317,14 +424,14 @@ def handle_file_browser(data):
     
     try:
         if action == 'list':
-            # 列出目录内容
-            command = f"ls -la '{path}'"
+            # 列出目录内容（路径经shlex.quote，空格和特殊字符安全）
+            command = f"ls -la {shlex.quote(path)}"
             result = engine_manager.exec_command(
-                container.container_id, 
-                command, 
+                container.container_id,
+                command,
                 container.engine_name
             )
-            
+
             if result['exit_code'] == 0:
                 emit('file_list', {
                     'path': path,
@@ -332,21 +439,36 @@ def handle_file_browser(data):
                 })
             else:
                 emit('error', {'message': f'无法访问路径: {path}'})
-                
+
         elif action == 'read':
-            # 读取文件内容
+            # 读取文件内容：优先走引擎归档接口，不起shell进程且二进制安全
             file_path = data.get('file_path')
             if not file_path:
                 emit('error', {'message': '文件路径不能为空'})
                 return
-            
-            command = f"cat '{file_path}'"
+
+            try:
+                raw = engine_manager.get_file(
+                    container.container_id, file_path, container.engine_name
+                )
+                if raw is not None:
+                    emit('file_content', {
+                        'file_path': file_path,
+                        'content': raw.decode('utf-8', errors='replace')
+                    })
+                else:
+                    emit('error', {'message': f'无法读取文件: {file_path}'})
+                return
+            except NotImplementedError:
+                pass
+
+            command = f"cat {shlex.quote(file_path)}"
             result = engine_manager.exec_command(
-                container.container_id, 
-                command, 
+                container.container_id,
+                command,
                 container.engine_name
             )
-            
+
             if result['exit_code'] == 0:
                 emit('file_content', {
                     'file_path': file_path,
@@ -354,44 +476,57 @@ def handle_file_browser(data):
                 })
             else:
                 emit('error', {'message': f'无法读取文件: {file_path}'})
-                
+
         elif action == 'write':
-            # 写入文件内容
+            # 写入文件内容：优先走引擎归档接口（与HTTP文件API同一条路径），
+            # 引擎不支持时回退shell写入，路径和内容都经shlex.quote
             file_path = data.get('file_path')
             content = data.get('content', '')
-            
+
             if not file_path:
                 emit('error', {'message': '文件路径不能为空'})
                 return
-            
-            # 使用echo写入文件（简单实现）
-            escaped_content = content.replace("'", "'\"'\"'")
-            command = f"echo '{escaped_content}' > '{file_path}'"
+
+            try:
+                dest_dir, filename = os.path.split(file_path)
+                ok = engine_manager.put_file(
+                    container.container_id, dest_dir or '/', filename,
+                    io.BytesIO(content.encode('utf-8')), container.engine_name
+                )
+                if ok:
+                    emit('file_saved', {'file_path': file_path})
+                else:
+                    emit('error', {'message': f'无法保存文件: {file_path}'})
+                return
+            except NotImplementedError:
+                pass
+
+            command = f"printf %s {shlex.quote(content)} > {shlex.quote(file_path)}"
             result = engine_manager.exec_command(
-                container.container_id, 
-                command, 
+                container.container_id,
+                command,
                 container.engine_name
             )
-            
+
             if result['exit_code'] == 0:
                 emit('file_saved', {'file_path': file_path})
             else:
                 emit('error', {'message': f'无法保存文件: {file_path}'})
-                
+
         elif action == 'delete':
             # 删除文件
             file_path = data.get('file_path')
             if not file_path:
                 emit('error', {'message': '文件路径不能为空'})
                 return
-            
-            command = f"rm -f '{file_path}'"
+
+            command = f"rm -f {shlex.quote(file_path)}"
             result = engine_manager.exec_command(
-                container.container_id, 
-                command, 
+                container.container_id,
+                command,
                 container.engine_name
             )
-            
+
             if result['exit_code'] == 0:
                 emit('file_deleted', {'file_path': file_path})
             else:
@@ -412,13 +547,14 @@ def handle_system_notification(data):
     if not message:
         return
     
-    # 广播给所有连接的用户
+    # 广播给所有连接的用户（服务器级emit不带room本身就是全局广播，
+    # broadcast=True是已废弃的冗余参数）
     socketio.emit('notification', {
         'message': message,
         'type': notification_type,
         'timestamp': time.time(),
         'from_admin': True
-    }, broadcast=True)
+    })
 
 # REST API endpoints for WebSocket management
 @websocket_bp.route('/api/terminals/active', methods=['GET'])
@@ -457,7 +593,7 @@ def get_terminal_history(terminal_id):
     return jsonify({
         'success': True,
         'data': {
-            'history': session['history'][-100:],  # 最近100行
+            'history': list(session['history'])[-100:],  # 最近100行
             'container_name': session['container'].actions
         }
     })
\ No newline at end of file
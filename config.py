@@ -5,6 +5,11 @@ class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'your-secret-key-here-change-in-production'
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///containerweb.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # 连接池基础配置：pre_ping剔除被服务端断开的连接，recycle防长连接老化
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_pre_ping': True,
+        'pool_recycle': 1800
+    }
     
     # JWT配置
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY') or 'jwt-secret-key-change-in-production'
@@ -13,6 +18,8 @@ class Config:
     # 上传配置
     UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'uploads')
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
+    # JSON请求体上限：在解析前按Content-Length直接拒掉超大载荷
+    MAX_JSON_BODY_BYTES = 1 * 1024 * 1024  # 1MB
     
     # 系统默认设置
     DEFAULT_MAX_CONTAINERS = 10
@@ -33,18 +40,32 @@ class Config:
     ALLOW_REGISTRATION = os.environ.get('ALLOW_REGISTRATION', 'true').lower() == 'true'
     REGISTRATION_CODE = os.environ.get('REGISTRATION_CODE') or ''
 
+    # 开发/测试环境下对列表查询附加raiseload('*')，让隐藏的懒加载N+1直接报错
+    RAISELOAD_DEV = False
+
 class DevelopmentConfig(Config):
     DEBUG = True
     SQLALCHEMY_DATABASE_URI = os.environ.get('DEV_DATABASE_URL') or 'sqlite:///containerweb_dev.db'
+    RAISELOAD_DEV = True
 
 class ProductionConfig(Config):
     DEBUG = False
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///containerweb.db'
+    # 生产环境接Postgres/MySQL时放大连接池；SQLite下保持默认，
+    # 这些参数对单文件库没有意义
+    SQLALCHEMY_ENGINE_OPTIONS = dict(Config.SQLALCHEMY_ENGINE_OPTIONS)
+    if not SQLALCHEMY_DATABASE_URI.startswith('sqlite'):
+        SQLALCHEMY_ENGINE_OPTIONS.update({
+            'pool_size': 20,
+            'max_overflow': 40,
+            'pool_use_lifo': True
+        })
 
 class TestingConfig(Config):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
     WTF_CSRF_ENABLED = False
+    RAISELOAD_DEV = True
 
 config = {
     'development': DevelopmentConfig,
@@ -1,3 +1,7 @@
+import os
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
 from src.HostAgents.Template import BaseServer
 from src.HostObject.HSConfig import HSConfig
 from src.HostObject.VMPowers import VMPowers
@@ -5,6 +9,18 @@ from src.HostObject.HWStatus import HWStatus
 from src.HostObject.ZMessage import ZMessage
 from src.HostObject.VMConfig import VMConfig
 
+# LXC容器根目录
+LXC_ROOT = "/var/lib/lxc"
+
+# lxc-info输出状态到电源枚举的映射
+_LXC_STATES = {
+    "RUNNING": VMPowers.STARTED,
+    "STOPPED": VMPowers.STOPPED,
+    "FROZEN": VMPowers.SUSPEND,
+    "STARTING": VMPowers.ON_OPEN,
+    "STOPPING": VMPowers.ON_STOP,
+}
+
 
 class HostServer(BaseServer):
     def __init__(self, config: HSConfig):
@@ -32,7 +48,35 @@ class HostServer(BaseServer):
 
     # 虚拟机列出 ==========================================
     def VMStatus(self, uuid: str | None) -> list[HWStatus]:
-        pass
+        # 状态扫描整批并发提交，不对N个容器做串行探测
+        names = [uuid] if uuid else self._list_vms()
+        if not names:
+            return []
+        with ThreadPoolExecutor(max_workers=min(32, len(names))) as pool:
+            return list(pool.map(self._query_status, names))
+
+    # 列出容器名 ==========================================
+    @staticmethod
+    def _list_vms() -> list[str]:
+        try:
+            with os.scandir(LXC_ROOT) as entries:
+                return [entry.name for entry in entries if entry.is_dir()]
+        except OSError:
+            return []
+
+    # 探测单容器状态 ======================================
+    @staticmethod
+    def _query_status(name: str) -> HWStatus:
+        status = HWStatus()
+        try:
+            output = subprocess.run(
+                ["lxc-info", "-n", name, "-sH"],
+                capture_output=True, text=True, timeout=10
+            ).stdout.strip()
+        except (OSError, subprocess.TimeoutExpired):
+            output = ""
+        status.ac_status = _LXC_STATES.get(output, VMPowers.UNKNOWN)
+        return status
 
     # 创建虚拟机 ==========================================
     def VMCreate(self, input_config: VMConfig) -> ZMessage:
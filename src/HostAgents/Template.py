@@ -7,7 +7,7 @@ from src.HostObject.ZMessage import ZMessage
 from src.HostObject.VMConfig import VMConfig
 
 
-class BaseServer(abc):
+class BaseServer(abc.ABC):
     def __init__(self, config: HSConfig):
         self.config: HSConfig | None = config
         self.status: HWStatus | None = None
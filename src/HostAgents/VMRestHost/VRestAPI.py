@@ -1,6 +1,31 @@
+import base64
+import functools
+import json
+import urllib.request
+from collections import defaultdict
+from contextlib import contextmanager
+
 from src.HostObject.VMConfig import VMConfig
 
 
+# 行模板的绑定format方法：循环里复用同一可调用对象，不逐次走f-string
+_STR_FMT = "{k} = \"{v}\"\n".format
+_RAW_FMT = "{k} = {v}\n".format
+
+
+# 值类型→行发射器：vmx值都是具体的内建类型，按type一次哈希探测
+# 选择处理器，省掉内层循环里链式isinstance的MRO遍历
+def _emit_str(write, key, value):
+    write(_STR_FMT(k=key, v=value))
+
+
+def _emit_raw(write, key, value):
+    write(_RAW_FMT(k=key, v=value))
+
+
+_EMITTERS = {str: _emit_str, int: _emit_raw, bool: _emit_raw, float: _emit_raw}
+
+
 class VRestAPI:
     def __init__(self,
                  host_addr="127.0.0.1:8697",
@@ -11,107 +36,160 @@ class VRestAPI:
         self.user_name = user_name
         self.pass_word = pass_word
         self.ver_agent = ver_agent
+        # 待发操作按主机聚合，flush时整批一次提交
+        self._pending: dict[str, list[dict]] = defaultdict(list)
+
+    @staticmethod
+    # 流式写出vmx =========================================================
+    def write_txt(in_config: dict, write, prefix: str = ""):
+        # 显式栈迭代展开嵌套字典，逐行交给write（file.write或
+        # list.append），不在内存攒整串；避免递归调用开销
+        emitters = _EMITTERS
+        stack = [(prefix, iter(in_config.items()))]
+        while stack:
+            cur_prefix, items = stack[-1]
+            for key, value in items:
+                full_key = f"{cur_prefix}{key}"
+                if type(value) is dict:
+                    # 值是字典时压栈，下一轮先展开子级再回到当前层
+                    stack.append((f"{full_key}.", iter(value.items())))
+                    break
+                emitters.get(type(value), _emit_raw)(write, full_key, value)
+            else:
+                stack.pop()
 
     @staticmethod
     # 创建vmx文本 =========================================================
     def create_txt(in_config: dict, prefix: str = ""):
-        result = ""
-        for key, value in in_config.items():
-            if isinstance(value, dict):
-                # 如果值是字典，递归处理
-                new_prefix = f"{prefix}{key}." if prefix else f"{key}."
-                result += VRestAPI.create_txt(value, new_prefix)
-            else:
-                # 如果值不是字典，直接生成配置行
-                full_key = f"{prefix}{key}" if prefix else key
-                if type(value) == str:
-                    result += f"{full_key} = \"{value}\"\n"
-                else:
-                    result += f"{full_key} = {value}\n"
-        return result
+        # 旧签名保留：行收集进列表最后一次join
+        parts = []
+        VRestAPI.write_txt(in_config, parts.append, prefix)
+        return "".join(parts)
 
     # 创建虚拟机 ======================================
-    def create_vmx(self, vm_config: VMConfig = None):
-        config = {
-            ".encoding": "GBK",
-            "config.version": "8",
-            "virtualHW.version": str(self.ver_agent),
-            "mks.enable3d": "TRUE",
-            "pciBridge0": {
-                "present": "TRUE"
-            },
-            "pciBridge4": {
-                "present": "TRUE",
-                "virtualDev": "pcieRootPort",
-                "functions": "8"
-            },
-            "vmci0": {
-                "present": "TRUE"
-            },
-            "hpet0": {
-                "present": "TRUE"
-            },
-            "nvram": vm_config.vm_uuid + ".nvram",
-            "virtualHW.productCompatibility": "hosted",
-            "displayName": vm_config.vm_uuid,
-            "firmware": "efi",
-            "guestOS": "windows9-64",
-            "numvcpus": str(vm_config.cpu_num),
-            "cpuid.coresPerSocket": str(vm_config.cpu_num),
-            "memsize": str(vm_config.mem_num),
-            "mem.hotadd": "TRUE",
-            "nvme0": {
-                "present": "TRUE",
-            },
-            "nvme0:0": {
-                "fileName": vm_config.vm_uuid + ".vmdk",
-                "present": "TRUE"
-            },
-            "usb": {
-                "present": "TRUE"
-            },
-            "ehci": {
-                "present": "TRUE"
-            },
-            "usb_xhci": {
-                "present": "TRUE"
-            },
-            "svga.graphicsMemoryKB": str(vm_config.gpu_mem * 1024),
-            "ethernet0": {
-                "connectionType": "nat",
-                "addressType": "generated",
-                "virtualDev": "e1000e",
-                "present": "TRUE"
-            },
-            "extendedConfigFile": vm_config.vm_uuid + ".vmxf",
-            "RemoteDisplay": {
-                "vnc": {
-                    "enabled": "TRUE",
-                    "port": "5901"
-                }
-            },
-
-        }
-        # config = {**config, **basic_config}
-        return VRestAPI.create_txt(config)
+    def create_vmx(self, vm_config: VMConfig = None, path: str = None):
+        # 硬件版本已烧入缓存模板，这里只替换随单台VM变化的字段；
+        # 给定path时直接写盘，调用方不必再攒一份完整字符串
+        text = _vmx_template(self.ver_agent).format_map({
+            "vm_uuid": vm_config.vm_uuid,
+            "cpu_num": vm_config.cpu_num,
+            "mem_num": vm_config.mem_num,
+            "gpu_mem_kb": vm_config.gpu_mem * 1024,
+        })
+        if path is not None:
+            with open(path, "w", encoding="utf-8", buffering=1 << 16) as save_file:
+                save_file.write(text)
+        return text
+
+    # vmx固定骨架：直接以展平键形式编写，嵌套只是原dict的可读性
+    # 包装，扁平元组免去任何展开步骤；少数字段留{占位符}待替换
+    _VMX_FLAT = (
+        (".encoding", "GBK"),
+        ("config.version", "8"),
+        ("virtualHW.version", "{ver_agent}"),
+        ("mks.enable3d", "TRUE"),
+        ("pciBridge0.present", "TRUE"),
+        ("pciBridge4.present", "TRUE"),
+        ("pciBridge4.virtualDev", "pcieRootPort"),
+        ("pciBridge4.functions", "8"),
+        ("vmci0.present", "TRUE"),
+        ("hpet0.present", "TRUE"),
+        ("nvram", "{vm_uuid}.nvram"),
+        ("virtualHW.productCompatibility", "hosted"),
+        ("displayName", "{vm_uuid}"),
+        ("firmware", "efi"),
+        ("guestOS", "windows9-64"),
+        ("numvcpus", "{cpu_num}"),
+        ("cpuid.coresPerSocket", "{cpu_num}"),
+        ("memsize", "{mem_num}"),
+        ("mem.hotadd", "TRUE"),
+        ("nvme0.present", "TRUE"),
+        ("nvme0:0.fileName", "{vm_uuid}.vmdk"),
+        ("nvme0:0.present", "TRUE"),
+        ("usb.present", "TRUE"),
+        ("ehci.present", "TRUE"),
+        ("usb_xhci.present", "TRUE"),
+        ("svga.graphicsMemoryKB", "{gpu_mem_kb}"),
+        ("ethernet0.connectionType", "nat"),
+        ("ethernet0.addressType", "generated"),
+        ("ethernet0.virtualDev", "e1000e"),
+        ("ethernet0.present", "TRUE"),
+        ("extendedConfigFile", "{vm_uuid}.vmxf"),
+        ("RemoteDisplay.vnc.enabled", "TRUE"),
+        ("RemoteDisplay.vnc.port", "5901"),
+    )
+
+    # 操作入队 ========================================
+    def _enqueue(self, op: str, vm_config: VMConfig):
+        # 管理扫描里逐VM发请求太贵：先入队，flush时按主机合并提交
+        self._pending[self.host_addr].append(
+            {"op": op, "vm": vm_config.to_dict()}
+        )
 
     # 配置虚拟机 ======================================
     def config_vmx(self, vm_config: VMConfig = None):
-        pass
+        self._enqueue("config", vm_config)
 
     # 删除虚拟机 ======================================
     def delete_vmx(self, vm_config: VMConfig = None):
-        pass
+        self._enqueue("delete", vm_config)
 
     # 虚拟机电源 ======================================
     def powers_vmx(self, vm_config: VMConfig = None):
-        pass
+        self._enqueue("powers", vm_config)
+
+    # 成批提交 ========================================
+    def flush(self):
+        # 每个主机一次POST多操作数组，摊薄TLS握手和HTTP帧开销
+        results = {}
+        auth = base64.b64encode(
+            f"{self.user_name}:{self.pass_word}".encode("utf-8")
+        ).decode()
+        for host, ops in self._pending.items():
+            if not ops:
+                continue
+            request = urllib.request.Request(
+                f"http://{host}/api/batch",
+                data=json.dumps(ops).encode("utf-8"),
+                headers={
+                    "Content-Type": "application/json",
+                    "Authorization": f"Basic {auth}",
+                },
+                method="POST",
+            )
+            with urllib.request.urlopen(request, timeout=30) as response:
+                results[host] = json.loads(response.read() or b"{}")
+        self._pending.clear()
+        return results
+
+    # 批量上下文 ======================================
+    @contextmanager
+    def batch(self):
+        # with vm_client.batch(): 块内操作只入队，退出时自动flush
+        try:
+            yield self
+        finally:
+            self.flush()
 
     # 虚拟机状态 ======================================
     def status_vmx(self, vm_config: VMConfig = None):
         pass
 
 
+# 导入时把扁平骨架串成模板，之后create_vmx只付格式化的成本
+_VMX_TEMPLATE = "".join(
+    f"{key} = \"{value}\"\n" if isinstance(value, str) else f"{key} = {value}\n"
+    for key, value in VRestAPI._VMX_FLAT
+)
+
+
+@functools.lru_cache(maxsize=8)
+def _vmx_template(ver_agent: int) -> str:
+    """按硬件版本缓存的模板：同版本的所有实例/调用共享一份，
+    create_vmx热路径只剩逐VM字段的一次format_map"""
+    return _VMX_TEMPLATE.replace("{ver_agent}", str(ver_agent))
+
+
 if __name__ == "__main__":
     vm_client = VRestAPI()
     vm_config = VMConfig()
@@ -126,7 +204,5 @@ if __name__ == "__main__":
     vm_config.web_num = 100
     vm_config.gpu_mem = 4096
 
-    vm_string = vm_client.create_vmx(vm_config)
+    vm_string = vm_client.create_vmx(vm_config, vm_config.vm_uuid + ".vmx")
     print(vm_string)
-    with open(vm_config.vm_uuid + ".vmx", "w", encoding="utf-8") as save_file:
-        save_file.write(vm_string)
@@ -3,7 +3,10 @@ import abc
 from src.HostObject.ZMessage import ZMessage
 
 
-class HSTasker(abc):
+class HSTasker(abc.ABC):
+    # 槽位省去每实例的属性字典
+    __slots__ = ("process", "success", "results", "message")
+
     def __init__(self):
         self.process = {}  # 任务所需信息
         self.success: bool = False
@@ -11,13 +14,16 @@ class HSTasker(abc):
         self.message: ZMessage | None = None
 
     # 检查任务状态 =========================
+    @abc.abstractmethod
     def check_task(self):
         pass
 
     # 开始执行任务 =========================
+    @abc.abstractmethod
     def start_task(self):
         pass
 
     # 停止执行任务 =========================
+    @abc.abstractmethod
     def force_stop(self):
         pass
@@ -1,11 +1,45 @@
-import json
-from src.HostObject.HWUsages import CPU_Usage, MEM_Usage, HDD_Usage, GPU_Usage
-from src.HostObject.HWUsages import PWR_Usage, NET_Usage, NAT_Usage, WEB_Usage
+from src.HostObject.HWUsages import Usage, gen_todict, json_dumps
 from src.HostObject.VMPowers import VMPowers as VPower
 
 
 class HWStatus:
+    # 槽位省去每实例的属性字典，大批量状态对象内存明显收窄
+    __slots__ = (
+        "_dirty", "_cached_json",
+        "ac_status",
+        "cpu_model", "cpu_total", "cpu_usage",
+        "mem_total", "mem_usage", "hdd_total", "hdd_usage",
+        "flu_total", "flu_usage", "nat_total", "nat_usage",
+        "web_total", "web_usage",
+        "gpu_total", "gpu_usage", "net_total", "net_usage",
+        "cpu_power", "pwr_usage",
+        "cpu_stats", "mem_stats", "hdd_stats", "gpu_stats",
+        "net_stats", "flu_stats", "nat_stats", "web_stats", "pwr_stats",
+    )
+
+    # 实时字段（顺序即输出顺序；ac_status与缓存字段不导出）
+    _FIELDS = (
+        "cpu_model", "cpu_total", "cpu_usage",
+        "mem_total", "mem_usage", "hdd_total", "hdd_usage",
+        "flu_total", "flu_usage", "nat_total", "nat_usage",
+        "web_total", "web_usage",
+        "gpu_total", "gpu_usage", "net_total", "net_usage",
+        "cpu_power", "pwr_usage",
+    )
+
+    # 历史字段：实时快照轮询常为None，序列化时仅在已填充时附加
+    _OPTIONAL = (
+        "cpu_stats", "mem_stats", "hdd_stats", "gpu_stats",
+        "net_stats", "flu_stats", "nat_stats", "web_stats", "pwr_stats",
+    )
+
+    # 实时字段的生成版构建函数（单条字典字面量指令）
+    _base_todict = gen_todict(_FIELDS)
+
     def __init__(self, **kwargs):
+        # 序列化缓存 ==========================
+        self._dirty: bool = True  # 字段变更后置脏
+        self._cached_json: str | None = None
         # 基础数据 ============================
         self.ac_status: VPower = VPower.UNKNOWN
         self.cpu_model: str = ""  # 当前CPU名称
@@ -30,57 +64,54 @@ class HWStatus:
         self.cpu_power: int = 0  # 当前核心温度
         self.pwr_usage: int = 0  # 当前核心功耗
         # 历史数据 ============================
-        self.cpu_stats: CPU_Usage | None = None
-        self.mem_stats: MEM_Usage | None = None
-        self.hdd_stats: HDD_Usage | None = None
-        self.gpu_stats: GPU_Usage | None = None
-        self.net_stats: NET_Usage | None = None
-        self.flu_stats: CPU_Usage | None = None
-        self.nat_stats: NAT_Usage | None = None
-        self.web_stats: WEB_Usage | None = None
-        self.pwr_stats: PWR_Usage | None = None
+        self.cpu_stats: Usage | None = None
+        self.mem_stats: Usage | None = None
+        self.hdd_stats: Usage | None = None
+        self.gpu_stats: Usage | None = None
+        self.net_stats: Usage | None = None
+        self.flu_stats: Usage | None = None
+        self.nat_stats: Usage | None = None
+        self.web_stats: Usage | None = None
+        self.pwr_stats: Usage | None = None
         # 加载数据 ============================
         self.__load__(**kwargs)
 
+    # 可加载字段集合：一次哈希探测替代逐键线性查找
+    _LOADABLE = frozenset(name for name in __slots__ if not name.startswith("_"))
+
     # 加载数据 ================================
     def __load__(self, **kwargs):
+        # 批量加载绕过置脏的__setattr__，结束后整体置脏一次
+        loadable = self._LOADABLE
         for key, value in kwargs.items():
-            if hasattr(self, key):
-                setattr(self, key, value)
+            if key in loadable:
+                object.__setattr__(self, key, value)
+        object.__setattr__(self, "_dirty", True)
 
     # 转换为字典 ==============================
-    def __dict__(self):
-        return {
-            "cpu_model": self.cpu_model,
-            "cpu_total": self.cpu_total,
-            "cpu_usage": self.cpu_usage,
-            "mem_total": self.mem_total,
-            "mem_usage": self.mem_usage,
-            "hdd_total": self.hdd_total,
-            "hdd_usage": self.hdd_usage,
-            "flu_total": self.flu_total,
-            "flu_usage": self.flu_usage,
-            "nat_total": self.nat_total,
-            "nat_usage": self.nat_usage,
-            "web_total": self.web_total,
-            "web_usage": self.web_usage,
-            "gpu_total": self.gpu_total,
-            "gpu_usage": self.gpu_usage,
-            "net_total": self.net_total,
-            "net_usage": self.net_usage,
-            "cpu_power": self.cpu_power,
-            "pwr_usage": self.pwr_usage,
-            "cpu_stats": self.cpu_stats,
-            "mem_stats": self.mem_stats,
-            "hdd_stats": self.hdd_stats,
-            "gpu_stats": self.gpu_stats,
-            "net_stats": self.net_stats,
-            "flu_stats": self.flu_stats,
-            "nat_stats": self.nat_stats,
-            "web_stats": self.web_stats,
-            "pwr_stats": self.pwr_stats,
-        }
+    def to_dict(self):
+        # 实时字段走生成版构建；历史字段为None时不进载荷
+        data = self._base_todict()
+        for key in self._OPTIONAL:
+            value = getattr(self, key)
+            if value is not None:
+                data[key] = value
+        return data
+
+    # 字段赋值时置脏 ==========================
+    def __setattr__(self, key, value):
+        # 下划线开头的缓存字段不触发置脏，避免递归
+        if not key.startswith("_"):
+            object.__setattr__(self, "_dirty", True)
+        object.__setattr__(self, key, value)
 
     # 转换为文本 ==============================
     def __str__(self):
-        return json.dumps(self.__dict__())
+        # 状态轮询会反复字符串化同一快照：字段未变时直接复用缓存，
+        # 不重建字典不重新编码（注意：就地改动list/dict不会置脏）
+        if not self._dirty and self._cached_json is not None:
+            return self._cached_json
+        text = json_dumps(self.to_dict())
+        object.__setattr__(self, "_cached_json", text)
+        object.__setattr__(self, "_dirty", False)
+        return text
@@ -1,92 +1,119 @@
 import json
-
-
-class Any_Usage:
-    def __init__(self):
-        self.all_num: int = 0
-        self.per_min: int = 0
-        self.summary: list = []
-
-    def __dict__(self):
-        return {
-            "all_num": self.all_num,
-            "per_min": self.per_min,
-            "summary": self.summary,
-        }
+from dataclasses import dataclass, field
+from typing import Any, ClassVar
+
+try:
+    import orjson  # Rust实现，序列化比标准库快数倍
+except ImportError:  # 环境缺orjson时退回标准库
+    orjson = None
+
+
+def _json_default(obj):
+    """嵌套对象经to_dict展开，其余类型用str兜底"""
+    to_dict = getattr(obj, "to_dict", None)
+    if to_dict is not None:
+        return to_dict()
+    return str(obj)
+
+
+def gen_todict(fields):
+    """按字段元组生成to_dict函数：方法体编译成一条字典字面量指令，
+    省去运行时遍历字段元组的循环与逐次getattr查找"""
+    body = ", ".join(f"'{name}': self.{name}" for name in fields)
+    namespace = {}
+    exec(f"def to_dict(self):\n    return {{{body}}}", namespace)
+    return namespace["to_dict"]
+
+
+def auto_todict(cls):
+    """类装饰器：依据类上的_FIELDS在类创建时生成to_dict"""
+    cls.to_dict = gen_todict(cls._FIELDS)
+    return cls
+
+
+def json_dumps(obj) -> str:
+    """紧凑JSON序列化：监控循环的热路径，优先走orjson"""
+    if orjson is not None:
+        return orjson.dumps(
+            obj, default=_json_default,
+            option=orjson.OPT_PASSTHROUGH_DATACLASS | orjson.OPT_NON_STR_KEYS,
+        ).decode()
+    return json.dumps(obj, default=_json_default, separators=(",", ":"))
+
+
+@dataclass(slots=True)
+class Usage:
+    """统一的用量统计对象：8个*_Usage子类只差少数扩展字段，
+    合并为单个带kind标记的dataclass，扩展字段按kind查表导出"""
+
+    kind: str = "any"
+    all_num: int = 0
+    per_min: int = 0
+    summary: list = field(default_factory=list)
+    details: Any = None  # cpu为list、gpu为dict，其余kind不导出
+    cpu_tmp: list = field(default_factory=list)  # 仅pwr导出
+    cpu_pwr: list = field(default_factory=list)  # 仅pwr导出
+
+    # 各kind在公共字段之外需要导出的扩展字段
+    _EXTRA_FIELDS: ClassVar[dict] = {
+        "cpu": ("details",),
+        "gpu": ("details",),
+        "pwr": ("cpu_tmp", "cpu_pwr"),
+    }
+
+    def to_dict(self):
+        # 每个kind一个生成的专用函数，见类定义后的查表构造
+        return self._TO_DICT_TABLE.get(self.kind, _USAGE_BASE_TODICT)(self)
 
     def __str__(self):
-        return json.dumps({self.__dict__()})
+        return json_dumps(self.to_dict())
+
 
+# 公共字段的to_dict与各kind的专用版本（类创建后生成一次）
+_USAGE_COMMON = ("all_num", "per_min", "summary")
+_USAGE_BASE_TODICT = gen_todict(_USAGE_COMMON)
+Usage._TO_DICT_TABLE = {
+    kind: gen_todict(_USAGE_COMMON + extras)
+    for kind, extras in Usage._EXTRA_FIELDS.items()
+}
 
-class CPU_Usage(Any_Usage):
-    def __init__(self):
-        super().__init__()
-        self.details: list = []
 
-    def __dict__(self):
-        return {
-            "all_num": self.all_num,
-            "per_min": self.per_min,
-            "summary": self.summary,
-            "details": self.details,
-        }
+# 兼容工厂：保留原类名形式的构造入口
+def Any_Usage() -> Usage:
+    return Usage(kind="any")
 
 
-class MEM_Usage(Any_Usage):
-    def __init__(self):
-        super().__init__()
+def CPU_Usage() -> Usage:
+    return Usage(kind="cpu", details=[])
 
 
-class HDD_Usage(Any_Usage):
-    def __init__(self):
-        super().__init__()
+def MEM_Usage() -> Usage:
+    return Usage(kind="mem")
 
 
-class GPU_Usage(Any_Usage):
-    def __init__(self):
-        super().__init__()
-        self.details: dict = {}
+def HDD_Usage() -> Usage:
+    return Usage(kind="hdd")
 
-    def __dict__(self):
-        return {
-            "all_num": self.all_num,
-            "per_min": self.per_min,
-            "summary": self.summary,
-            "details": self.details,
-        }
 
+def GPU_Usage() -> Usage:
+    return Usage(kind="gpu", details={})
 
-class NET_Usage(Any_Usage):
-    def __init__(self):
-        super().__init__()
 
+def NET_Usage() -> Usage:
+    return Usage(kind="net")
 
-class FLU_Usage(Any_Usage):
-    def __init__(self):
-        super().__init__()
 
+def FLU_Usage() -> Usage:
+    return Usage(kind="flu")
 
-class NAT_Usage(Any_Usage):
-    def __init__(self):
-        super().__init__()
 
+def NAT_Usage() -> Usage:
+    return Usage(kind="nat")
 
-class WEB_Usage(Any_Usage):
-    def __init__(self):
-        super().__init__()
 
+def WEB_Usage() -> Usage:
+    return Usage(kind="web")
 
-class PWR_Usage(Any_Usage):
-    def __init__(self):
-        super().__init__()
-        self.cpu_tmp: list = []
-        self.cpu_pwr: list = []
 
-    def __dict__(self):
-        return {
-            "all_num": self.all_num,
-            "per_min": self.per_min,
-            "summary": self.summary,
-            "cpu_tmp": self.cpu_tmp,
-            "cpu_pwr": self.cpu_pwr,
-        }
+def PWR_Usage() -> Usage:
+    return Usage(kind="pwr")
@@ -1,31 +1,47 @@
+from src.HostObject.HWUsages import auto_todict, json_dumps
+
+
+@auto_todict  # 依据_FIELDS生成to_dict，单条字典字面量指令完成构建
 class IPConfig:
+    # 槽位省去每实例的属性字典
+    __slots__ = ("ip_addr", "ip_mask")
+    _FIELDS = ("ip_addr", "ip_mask")
+
     def __init__(self):
         self.ip_addr: str = ""
         self.ip_mask: str = ""
 
-    def __dict__(self):
-        return {
-            "ip_addr": self.ip_addr,
-            "ip_mask": self.ip_mask,
-        }
-
 
+@auto_todict
 class NCConfig:
+    __slots__ = ("mac_addr", "ip4_addr", "ip6_addr")
+    _FIELDS = ("mac_addr", "ip4_addr", "ip6_addr")
+
     def __init__(self):
         self.mac_addr: str = ""
         self.ip4_addr: list[IPConfig] = []
         self.ip6_addr: list[IPConfig] = []
 
-    def __dict__(self):
-        return {
-            "mac_addr": self.mac_addr,
-            "ip4_addr": self.ip4_addr,
-            "ip6_addr": self.ip6_addr,
-        }
-
 
+@auto_todict
 class VMConfig:
+    __slots__ = (
+        "_dirty", "_cached_json",
+        "vm_uuid", "cpu_num", "mem_num", "hdd_num", "gpu_num",
+        "net_num", "flu_num", "nat_num", "web_num", "gpu_mem",
+        "nic_all",
+    )
+
+    # 序列化字段（顺序即输出顺序；gpu_mem与缓存字段不导出）
+    _FIELDS = (
+        "vm_uuid", "cpu_num", "mem_num", "hdd_num", "gpu_num",
+        "net_num", "flu_num", "nat_num", "web_num", "nic_all",
+    )
+
     def __init__(self, **kwargs):
+        # 序列化缓存 =========================
+        self._dirty: bool = True  # 字段变更后置脏
+        self._cached_json: str | None = None
         # 机器配置 ===========================
         self.vm_uuid = ""  # 设置虚拟机名-UUID
         self.cpu_num = 0  # 分配的处理器核心数
@@ -41,27 +57,33 @@ class VMConfig:
         # 加载数据 ===========================
         self.__load__(**kwargs)
 
+    # 可加载字段集合：一次哈希探测替代逐键线性查找
+    _LOADABLE = frozenset(name for name in __slots__ if not name.startswith("_"))
+
     # 加载数据 ===============================
     def __load__(self, **kwargs):
+        # 批量加载绕过置脏的__setattr__，结束后整体置脏一次
+        loadable = self._LOADABLE
         for key, value in kwargs.items():
-            if hasattr(self, key):
-                setattr(self, key, value)
+            if key in loadable:
+                object.__setattr__(self, key, value)
+        object.__setattr__(self, "_dirty", True)
+
+    # 转换为字典：to_dict由auto_todict按_FIELDS生成
 
-    # 转换为字典 =============================
-    def __dict__(self):
-        return {
-            "vm_uuid": self.vm_uuid,
-            "cpu_num": self.cpu_num,
-            "mem_num": self.mem_num,
-            "hdd_num": self.hdd_num,
-            "gpu_num": self.gpu_num,
-            "net_num": self.net_num,
-            "flu_num": self.flu_num,
-            "nat_num": self.nat_num,
-            "web_num": self.web_num,
-            "nic_all": self.nic_all,
-        }
+    # 字段赋值时置脏 =========================
+    def __setattr__(self, key, value):
+        # 下划线开头的缓存字段不触发置脏，避免递归
+        if not key.startswith("_"):
+            object.__setattr__(self, "_dirty", True)
+        object.__setattr__(self, key, value)
 
     # 转换为字符串 ===========================
     def __str__(self):
-        return json.dumps(self.__dict__())
+        # 字段未变时复用上次序列化结果（就地改动list/dict不会置脏）
+        if not self._dirty and self._cached_json is not None:
+            return self._cached_json
+        text = json_dumps(self.to_dict())
+        object.__setattr__(self, "_cached_json", text)
+        object.__setattr__(self, "_dirty", False)
+        return text
@@ -1,7 +1,10 @@
 import enum
 
 
-class VMPowers(enum.Enum):
+class VMPowers(enum.IntEnum):
+    # IntEnum：比较即整数比较，序列化直接出整数
+    __slots__ = ()
+
     # 基本状态 ==========
     STOPPED = 0x0  # 停止
     STARTED = 0x1  # 启动
@@ -12,8 +15,8 @@ class VMPowers(enum.Enum):
     ON_SAVE = 0x5  # 保存
     ON_WAKE = 0x6  # 唤醒
     # 命令状态 ==========
-    S_RESET = 0x8  # 重置
-    H_RESET = 0x8  # 重置
+    S_RESET = 0x7  # 软重置（原与H_RESET同值0x8，会被enum静默合并为别名）
+    H_RESET = 0x8  # 硬重置
     S_CLOSE = 0x9  # 关闭
     H_CLOSE = 0xa  # 关闭
     A_PAUSE = 0xb  # 暂停
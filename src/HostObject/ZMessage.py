@@ -1,8 +1,11 @@
-import json
+from src.HostObject.HWUsages import json_dumps
 
 
 class ZMessage:
     def __init__(self, ):
+        # 序列化缓存 ============================
+        self._dirty: bool = True  # 字段变更后置脏
+        self._cached_json: str | None = None
         self.success: bool = True
         self.actions: str = ""
         self.message: str = ""
@@ -11,13 +14,29 @@ class ZMessage:
 
     # 转换为字典 ============================
     def __dict__(self):
+        # 异常只导出类型名与消息，不带repr可能携带的大段参数
+        execute = self.execute
         return {
             "success": self.success,
-            "actions": self.message,
+            "actions": self.actions,
+            "message": self.message,
             "results": self.results,
-            "execute": repr(self.execute)
+            "execute": f"{type(execute).__name__}: {execute}" if execute is not None else None
         }
 
+    # 字段赋值时置脏 ========================
+    def __setattr__(self, key, value):
+        # 下划线开头的缓存字段不触发置脏，避免递归
+        if not key.startswith("_"):
+            object.__setattr__(self, "_dirty", True)
+        object.__setattr__(self, key, value)
+
     # 转换为字符串 ==========================
     def __str__(self):
-        return json.dumps({self.__dict__()})
+        # 字段未变时复用上次序列化结果
+        if not self._dirty and self._cached_json is not None:
+            return self._cached_json
+        text = json_dumps(self.__dict__())
+        object.__setattr__(self, "_cached_json", text)
+        object.__setattr__(self, "_dirty", False)
+        return text